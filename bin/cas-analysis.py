@@ -2,8 +2,9 @@
 
 import os
 import argparse
-from cell import Cell
-from param import Param
+import numpy as np
+from castepy.res import Res
+from castepy.scf import Scf
 
 
 #===============================================================================
@@ -17,17 +18,18 @@ def get_args():
 
     parser = argparse.ArgumentParser(
         formatter_class=argparse.RawDescriptionHelpFormatter,
-        description="Retrieve structures from Materials Project database",
+        description="Quick analysis of a seed: slab thickness, initial magnetic moments, SCF loops",
         epilog="examples:\n"
-               "    mp_query.py -el Li,Ni,O\n"
-               "    mp_query.py -el Li,Ni,O -in 20\n"
+               "    cas-analysis.py -s Ni -m scf          # per SCF loop, as cas-scf.py\n"
+               "    cas-analysis.py -s Ni -m magnetic     # initial magnetic moments in Ni.castep\n"
+               "    cas-analysis.py -s Ni -m thickness    # thickness of the slab in Ni.res\n"
     )
     parser.add_argument('-s', '--seed', type=str, dest='seed',
                         default=None,
                         help='seed')
     parser.add_argument('-m', '--mode', type=str, dest='mode',
-                        default='airss_spin',
-                        help='Nmode')
+                        default='scf', choices=['scf', 'magnetic', 'thickness'],
+                        help='mode')
 
     args = parser.parse_args()
 
@@ -60,28 +62,35 @@ def get_args():
 
 
 def calc_thickness(seed):
-    echo "$f"                                                                                                           
-    lattc=$(awk '/CELL/{print $5}' "$f")                                                                                
-    echo "lattice parameter c: $lattc Angstrom"                                                                         
-                                                                                                                        
-    # Extract fifth column of data                                                                                      
-    fracposz=$(awk '/SFAC/,/END/ {if ($0 !~ /SFAC|END/) print $5}' "$f")                                                
-                                                                                                                        
-    diff=$(echo "$fracposz" | sort -nr | awk 'NR==1{max=$1} END{printf "%.13f", max - $1}')                             
-                                                                                                                        
-    thickness=$(echo "$diff $lattc" | awk '{printf "%.13f", $1 * $2 / 10}')                                             
-    echo -e "thickness : $thickness nm   
-
-def show initial magnetic(castep):
-    sed -n '/Initial magnetic/,/xx/p' $file | tail -n 1                                                                 
-    sed -n '/Initial magnetic/,/xx/p' $file        
-
-def show scf(castep):
-for file in `ls *.castep`; do                                                                                           
-    echo $file                                                                                                          
-    grep "<-- SCF" $file | head -n 4                                                                                    
-    grep "<-- SCF" $file | tail -n 1                                                                                    
-done     
+    """
+    Extent of the atoms along c in {seed}.res (nm)
+    """
+    res = Res.from_file(f"{seed}.res")
+    lattc = res.abc[2]
+    print(f"lattice parameter c: {lattc} Angstrom")
+
+    fracposz = res.positions[:, 2]
+    thickness = (np.max(fracposz) - np.min(fracposz)) * lattc / 10
+    print(f"thickness : {thickness:.13f} nm")
+
+def show_initial_magnetic(seed):
+    """
+    Initial magnetic moments box(es) of {seed}.castep
+    """
+    with open(f"{seed}.castep", 'r', errors='replace') as f:
+        inside = False
+        for line in f:
+            if 'Initial magnetic' in line:
+                inside = True
+            if inside:
+                print(line, end='')
+                if 'xx' in line:
+                    inside = False
+
+def show_scf(seed):
+    for loop in Scf.from_seed(seed).summary():
+        print(f"{loop['loop']:>5} {loop['step']:>5} {loop['ncycles']:>5} {loop['energy']:>18.8f} "
+              f"{loop['seconds_per_cycle']:>8.2f} {loop['convergence_rate']:>8.3f}")
 
 #===============================================================================
 # Main
@@ -94,15 +103,13 @@ if __name__ == "__main__":
     seed = args.seed
     mode = args.mode
 
-    if args.mode == "airss_spin":
-        airss_spin(seed)
+    if args.mode == "scf":
+        show_scf(seed)
 
-    elif args.mode == "ms_surface":
-        ms_surface(seed)
+    elif args.mode == "magnetic":
+        show_initial_magnetic(seed)
 
-    #test_geom_tol(seed)
-    #test_set_restart(seed)
-    
-    #param_gen_gencell()
+    elif args.mode == "thickness":
+        calc_thickness(seed)
 
 
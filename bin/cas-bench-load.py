@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+
+import os
+import time
+import glob
+import shutil
+import argparse
+import tempfile
+from castepy.cell import Cell
+from castepy.param import Param
+
+
+#===============================================================================
+# Arguments
+#==============================================================================
+
+def get_args():
+    """
+    Parse arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Benchmark loading of .cell and .param files (files/second)",
+        epilog="examples:\n"
+               "    cas-bench-load.py -s LiNiO2 -N 20000            # copies of LiNiO2.cell/.param\n"
+               "    cas-bench-load.py -g 'airss/*.cell' -n 1 8 32\n"
+               "    cas-bench-load.py -s LiNiO2 -b                  # against the line-by-line readers\n"
+    )
+    parser.add_argument('-s', '--seed', type=str, dest='seed',
+                        default=None,
+                        help='seed copied N times into a temporary directory')
+    parser.add_argument('-N', '--ncopies', type=int, dest='ncopies',
+                        default=10000,
+                        help='number of copies of the seed')
+    parser.add_argument('-g', '--glob', type=str, dest='glob',
+                        default=None,
+                        help='existing .cell files (the .param next to them is used if present)')
+    parser.add_argument('-n', '--nproc', type=int, nargs='+', dest='nproc',
+                        default=[1, 0],
+                        help='number of processes to try (0: all cores)')
+    parser.add_argument('-b', '--baseline', action='store_true', dest='baseline',
+                        help='time the former line-by-line readers too (single process)')
+
+    args = parser.parse_args()
+
+    if args.seed is None and args.glob is None:
+        parser.error("a seed (-s) or .cell files (-g) are needed")
+
+
+    # banner
+
+    banner = [
+        f"",
+        f"     {os.path.basename(__file__)}",
+        f"",
+        f"       Summary of arguments",
+        f""
+    ]
+
+    banner += [
+        f"         {attr:<20}: {getattr(args, attr)}"
+        for attr in dir(args)
+        if not attr.startswith('_')
+    ]
+
+    print("\n".join(banner) + "\n")
+
+    return args
+
+
+#===============================================================================
+# Funcitons
+#==============================================================================
+
+def copy_seed(seed, ncopies, directory):
+    for ext in ['cell', 'param']:
+        if os.path.isfile(f"{seed}.{ext}"):
+            for i in range(ncopies):
+                shutil.copyfile(f"{seed}.{ext}", os.path.join(directory, f"{i}.{ext}"))
+    return sorted(glob.glob(os.path.join(directory, '*.cell')))
+
+
+def baseline_cell(filename):
+    """
+    The former Cell.from_file: readlines() and per-line lower()/split()
+    (without its debug print)
+    """
+    cell = {}
+    with open(filename, 'r') as f:
+        lines = iter(f.readlines())
+        for line in lines:
+            temp = line.strip()
+            if not temp or temp.startswith('#'):
+                continue
+            if temp.lower().startswith('%block'):
+                keyword = line.lower().split()[1]
+                cell[keyword] = []
+                for line in lines:
+                    temp = line.strip()
+                    if temp.lower().startswith('%endblock'):
+                        break
+                    cell[keyword].append(temp)
+            else:
+                temp = temp.lower()
+                tokens = temp.split(':', maxsplit=1)
+                if len(tokens) < 2:
+                    tokens = temp.split(maxsplit=1) + ['']
+                cell[tokens[0].strip()] = tokens[1].strip()
+    return cell
+
+
+def baseline_param(filename):
+    """
+    The former Param.from_file
+    """
+    param = {}
+    with open(filename, 'r') as f:
+        for line in f:
+            if not line.strip() or line.strip().startswith('#') or ':' not in line:
+                continue
+            keyword, value = line.split(':', 1)
+            value = value.split()[0] if value.split() else ''
+            param[keyword.strip().lower()] = value.strip().lower()
+    return param
+
+
+def bench(name, load, filenames, nproc):
+    start = time.perf_counter()
+    load(filenames, nproc)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<14} {nproc or os.cpu_count():>6} {len(filenames):>8} "
+          f"{elapsed:>10.3f} {len(filenames) / elapsed:>12.0f}")
+
+
+#===============================================================================
+# Main
+#==============================================================================
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        if args.seed:
+            cells = copy_seed(args.seed, args.ncopies, directory)
+        else:
+            cells = sorted(glob.glob(args.glob))
+        params = [cell[:-len('.cell')] + '.param' for cell in cells]
+        params = [param for param in params if os.path.isfile(param)]
+
+        print(f"{'loader':<14} {'nproc':>6} {'files':>8} {'time(s)':>10} {'files/s':>12}")
+        if args.baseline:
+            if cells:
+                bench('Cell(before)', lambda names, _: [baseline_cell(name) for name in names], cells, 1)
+            if params:
+                bench('Param(before)', lambda names, _: [baseline_param(name) for name in names], params, 1)
+        for nproc in args.nproc:
+            if cells:
+                bench('Cell', lambda names, n: Cell.load_many(names, processes=n or None), cells, nproc)
+            if params:
+                bench('Param', lambda names, n: Param.load_many(names, processes=n or None), params, nproc)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+import os
+import argparse
+from castepy.cache import ParseCache
+
+
+#===============================================================================
+# Arguments
+#==============================================================================
+
+def get_args():
+    """
+    Parse arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Manage the castepy parse cache",
+        epilog="examples:\n"
+               "    cas-cache.py -m stats\n"
+               "    cas-cache.py -m prune\n"
+               "    cas-cache.py -m evict -d 30\n"
+               "    cas-cache.py -m clear\n"
+    )
+    parser.add_argument('-m', '--mode', type=str, dest='mode',
+                        default='stats', choices=['stats', 'prune', 'evict', 'clear'],
+                        help='mode')
+    parser.add_argument('-d', '--days', type=float, dest='days',
+                        default=30.0,
+                        help='evict records not used for this many days')
+    parser.add_argument('-f', '--file', type=str, dest='file',
+                        default=None,
+                        help='cache file (default: $CASTEPY_CACHE or ~/.cache/castepy/parse.sqlite)')
+
+    args = parser.parse_args()
+
+
+    # banner
+
+    banner = [
+        f"",
+        f"     {os.path.basename(__file__)}",
+        f"",
+        f"       Summary of arguments",
+        f""
+    ]
+
+    banner += [
+        f"         {attr:<20}: {getattr(args, attr)}"
+        for attr in dir(args)
+        if not attr.startswith('_')
+    ]
+
+    print("\n".join(banner) + "\n")
+
+    return args
+
+
+#===============================================================================
+# Main
+#==============================================================================
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    with ParseCache(args.file) as cache:
+
+        if args.mode == "stats":
+            print(f"cache file : {cache.filename}")
+            for kind, count in cache.stats().items():
+                print(f"{kind:10s} : {count} records")
+
+        elif args.mode == "prune":
+            print(f"removed {cache.prune()} stale records")
+
+        elif args.mode == "evict":
+            print(f"removed {cache.evict(args.days)} records unused for {args.days} days")
+
+        elif args.mode == "clear":
+            print(f"removed {cache.clear()} records")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+import os
+import time
+import argparse
+from castepy.follow import CastepFollower, poll, format_row
+
+
+#===============================================================================
+# Arguments
+#==============================================================================
+
+def get_args():
+    """
+    Parse arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Geometry optimisation convergence of (running) CASTEP jobs",
+        epilog="examples:\n"
+               "    cas-conv.py -s Ni\n"
+               "    cas-conv.py -s Ni Co -f -n 60\n"
+    )
+    parser.add_argument('-s', '--seed', type=str, dest='seeds', nargs='+',
+                        default=[],
+                        help='seed(s)')
+    parser.add_argument('-f', '--follow', action='store_true', dest='follow',
+                        help='keep polling the .castep files for new output')
+    parser.add_argument('-n', '--interval', type=float, dest='interval',
+                        default=60.0,
+                        help='seconds between polls in follow mode')
+
+    args = parser.parse_args()
+
+
+    # banner
+
+    banner = [
+        f"",
+        f"     {os.path.basename(__file__)}",
+        f"",
+        f"       Summary of arguments",
+        f""
+    ]
+
+    banner += [
+        f"         {attr:<20}: {getattr(args, attr)}"
+        for attr in dir(args)
+        if not attr.startswith('_')
+    ]
+
+    print("\n".join(banner) + "\n")
+
+    return args
+
+
+#===============================================================================
+# Main
+#==============================================================================
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    followers = {
+        f"{seed}-conv.dat": CastepFollower.load(f"{seed}.castep")
+        for seed in args.seeds
+    }
+
+    while True:
+        for table, follower in followers.items():
+            for row in poll(follower, table):
+                print(f"{follower.filename}\t{format_row(row)}")
+
+        if not args.follow:
+            break
+
+        time.sleep(args.interval)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+import sys
+import argparse
+from castepy.cell import Cell
+from castepy.res import Res, res_from_cell, cell_from_res
+
+
+#===============================================================================
+# Arguments
+#==============================================================================
+
+def get_args():
+    """
+    Parse arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Convert structures between .cell (incl. -out.cell) and .res, keeping SPIN",
+        epilog="examples:\n"
+               "    cas-convert.py -i Ni-out.cell -o Ni.res\n"
+               "    cas-convert.py -i Ni.res -o Ni.cell\n"
+               "    cas-convert.py -i Ni.cell -o -          # .res to stdout\n"
+               "    cas-convert.py -i Ni-out.cell -n        # number of atoms\n"
+               "    cas-convert.py -i Ni-out.cell -u Ni.cell  # relaxed structure into Ni.cell\n"
+    )
+    parser.add_argument('-i', '--input', type=str, dest='input',
+                        default=None,
+                        help='input (.cell or .res)')
+    parser.add_argument('-o', '--output', type=str, dest='output',
+                        default=None,
+                        help="output (.cell or .res, '-' for .res to stdout)")
+    parser.add_argument('-u', '--update', type=str, dest='update',
+                        default=None,
+                        help='.cell to take the lattice and positions of the input (.cell)')
+    parser.add_argument('-t', '--title', type=str, dest='title',
+                        default=None,
+                        help='seed in the TITL record of the .res')
+    parser.add_argument('-n', '--nat', action='store_true', dest='nat',
+                        help='print the number of atoms')
+
+    return parser.parse_args()
+
+
+#===============================================================================
+# Main
+#==============================================================================
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    if args.input.endswith('.res'):
+        res = Res.from_file(args.input)
+        nat = len(res.species)
+    else:
+        cell = Cell.from_file(args.input)
+        res = res_from_cell(cell, seed=args.title)
+        nat = len(cell.species)
+
+    if args.nat:
+        print(nat)
+
+    if args.update is not None:
+        target = Cell.from_file(args.update)
+        target.set_structure(cell)
+        target.to_file()
+
+    if args.output is None:
+        pass
+    elif args.output == '-' or args.output.endswith('.res'):
+        if args.title:
+            res.seed = args.title
+        if args.output == '-':
+            sys.stdout.write(str(res))
+        else:
+            res.to_file(args.output)
+    else:
+        seed = args.output[:-len('.cell')]
+        if args.input.endswith('.res'):
+            cell_from_res(res, seed=seed).to_file(args.output)
+        else:
+            cell.seed = seed
+            cell.to_file(args.output, force=True)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+import os
+import argparse
+from castepy.crawl import crawl
+from castepy.cache import ParseCache
+
+
+#===============================================================================
+# Arguments
+#==============================================================================
+
+def get_args():
+    """
+    Parse arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Summarise every CASTEP run under a directory tree into one table",
+        epilog="examples:\n"
+               "    cas-crawl.py -r . -o summary.csv\n"
+               "    cas-crawl.py -r campaign -o summary.parquet -n 64 -c 32\n"
+               "    cas-crawl.py -r campaign -o summary.csv -C\n"
+    )
+    parser.add_argument('-r', '--root', type=str, dest='root',
+                        default='.',
+                        help='root directory')
+    parser.add_argument('-o', '--output', type=str, dest='output',
+                        default='summary.csv',
+                        help='output table (.csv or .parquet)')
+    parser.add_argument('-n', '--nproc', type=int, dest='nproc',
+                        default=None,
+                        help='number of processes (default: all cores)')
+    parser.add_argument('-c', '--chunksize', type=int, dest='chunksize',
+                        default=16,
+                        help='files handed to a process at a time')
+    parser.add_argument('-C', '--cache', action='store_true', dest='cache',
+                        help='reuse records of unchanged files from the parse cache (see cas-cache.py)')
+
+    args = parser.parse_args()
+
+
+    # banner
+
+    banner = [
+        f"",
+        f"     {os.path.basename(__file__)}",
+        f"",
+        f"       Summary of arguments",
+        f""
+    ]
+
+    banner += [
+        f"         {attr:<20}: {getattr(args, attr)}"
+        for attr in dir(args)
+        if not attr.startswith('_')
+    ]
+
+    print("\n".join(banner) + "\n")
+
+    return args
+
+
+#===============================================================================
+# Main
+#==============================================================================
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    cache = ParseCache() if args.cache else None
+
+    try:
+        nfiles, nerrors = crawl(args.root, args.output, processes=args.nproc,
+                                chunksize=args.chunksize, cache=cache)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    print(f"{nfiles} .castep files summarised into {args.output} ({nerrors} failed)")
@@ -59,7 +59,7 @@ def get_args():
 
 def airss_spin(seed):
     cell = Cell.from_seed(seed)
-    #cell.copy_to_md5()
+    #cell.snapshot()
     cell.set_spin('mp')
     cell.to_file()
 
@@ -67,7 +67,7 @@ def airss_spin(seed):
 def ms_surface(seed):
 
     cell = Cell.from_seed(seed)
-    cell.copy_to_md5()
+    cell.snapshot()
 
     cell.set_spin('mp')
     cell.set_kpoints(0.05)
@@ -83,7 +83,7 @@ def ms_surface(seed):
     cell.to_file()
 
     param = Param.from_seed(seed)
-    param.copy_to_md5() 
+    param.snapshot() 
 
     param.set_scf_mixing('default-vasp')
     param.set_scf_tol('medium')
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+import argparse
+from castepy.mulliken import Mulliken
+
+
+#===============================================================================
+# Arguments
+#==============================================================================
+
+def get_args():
+    """
+    Parse arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Mulliken charges and spins of a CASTEP run (for shell pipelines)",
+        epilog="examples:\n"
+               "    cas-mulliken.py -s Ni          # species, charge, spin of the last block\n"
+               "    cas-mulliken.py -s Ni -c       # 'SPIN= x' per ion of the last block\n"
+               "    cas-mulliken.py -s Ni -t       # total spin of every block\n"
+    )
+    parser.add_argument('-s', '--seed', type=str, dest='seed',
+                        default=None,
+                        help='seed')
+    parser.add_argument('-c', '--cell', action='store_true', dest='cell',
+                        help='print SPIN= per ion of the last block')
+    parser.add_argument('-t', '--total', action='store_true', dest='total',
+                        help='print the total spin of every block')
+
+    return parser.parse_args()
+
+
+#===============================================================================
+# Main
+#==============================================================================
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    mulliken = Mulliken.from_seed(args.seed)
+
+    if args.total:
+        for spin in mulliken.total_spin():
+            print(f"{spin:g}")
+    elif len(mulliken) == 0:
+        pass
+    elif args.cell and not mulliken.polarised:
+        # nothing for runs without spin: there is no SPIN= to set
+        pass
+    elif args.cell:
+        for spin in mulliken.spin[-1]:
+            print(f"SPIN= {spin:g}")
+    else:
+        for element, charge, spin in zip(mulliken.species, mulliken.charge[-1], mulliken.spin[-1]):
+            print(f"{element}\t{charge:g}\t{spin:g}")
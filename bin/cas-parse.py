@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+import os
+import argparse
+from castepy import castep
+from castepy.cache import ParseCache, parse_cached
+
+
+#===============================================================================
+# Arguments
+#==============================================================================
+
+def get_args():
+    """
+    Parse arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Summarise (concatenated) CASTEP runs of a seed as TSV",
+        epilog="examples:\n"
+               "    cas-parse.py -s Ni\n"
+               "    cas-parse.py -s Ni -p data\n"
+               "    cas-parse.py -s Ni -r -1 -i\n"
+               "    cas-parse.py -s Ni --no-cache\n"
+    )
+    parser.add_argument('-s', '--seed', type=str, dest='seed',
+                        default=None,
+                        help='seed')
+    parser.add_argument('-p', '--prefix', type=str, dest='prefix',
+                        default='data',
+                        help='prefix of the output tsv files')
+    parser.add_argument('-r', '--run', type=int, dest='run',
+                        default=None,
+                        help='parse only this run of a concatenated file (e.g. -1 for the last)')
+    parser.add_argument('-i', '--index', action='store_true', dest='index',
+                        help='keep the byte-offset index of runs in <seed>.castep.idx')
+    parser.add_argument('--no-cache', action='store_false', dest='cache',
+                        help='parse the file again even if the parse cache has its records (see cas-cache.py)')
+
+    args = parser.parse_args()
+
+
+    # banner
+
+    banner = [
+        f"",
+        f"     {os.path.basename(__file__)}",
+        f"",
+        f"       Summary of arguments",
+        f""
+    ]
+
+    banner += [
+        f"         {attr:<20}: {getattr(args, attr)}"
+        for attr in dir(args)
+        if not attr.startswith('_')
+    ]
+
+    print("\n".join(banner) + "\n")
+
+    return args
+
+
+#===============================================================================
+# Main
+#==============================================================================
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    seed = args.seed
+
+    if args.cache and args.run is None:
+        if args.index:
+            castep.index_runs(f"{seed}.castep", sidecar=True)
+        with ParseCache() as cache:
+            runs = parse_cached(f"{seed}.castep", cache)
+    elif args.run is None and not args.index:
+        runs = castep.parse(f"{seed}.castep")
+    else:
+        index = castep.index_runs(f"{seed}.castep", sidecar=args.index)
+        if args.run is None:
+            runs = [castep.parse_run(f"{seed}.castep", n, runs=index) for n in range(len(index))]
+        else:
+            runs = [castep.parse_run(f"{seed}.castep", args.run, runs=index)] if index else []
+    if not runs:
+        print(f"{seed}.castep: no CASTEP run found ...")
+        exit(1)
+
+    kpoints_mp_spacing = castep.read_kpoints_mp_spacing(f"{seed}.cell")
+    for run in runs:
+        run.kpoints_mp_spacing = kpoints_mp_spacing
+
+    castep.write_tsv(runs, prefix=args.prefix)
+
+    print(f"parsed {len(runs)} run(s) of {seed}.castep ...")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+import os
+import argparse
+from castepy.recipe import Recipe, find_seeds, run_recipe
+
+
+#===============================================================================
+# Arguments
+#==============================================================================
+
+def get_args():
+    """
+    Parse arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Apply a recipe of Cell/Param setter calls to many seeds",
+        epilog="examples:\n"
+               "    cas-recipe.py -r ms-surface.json -s '*.cell'\n"
+               "    cas-recipe.py -r ms-surface.json -s 'runs/*/*.cell' -n 32\n"
+               "    cas-recipe.py -r ms-surface.yaml -s Ni.cell -d      # show changes only\n"
+    )
+    parser.add_argument('-r', '--recipe', type=str, dest='recipe',
+                        default=None,
+                        help='recipe (.json, or .yaml with PyYAML installed)')
+    parser.add_argument('-s', '--seeds', type=str, nargs='+', dest='seeds',
+                        default=['*.cell'],
+                        help='glob patterns of .cell/.param files')
+    parser.add_argument('-n', '--nproc', type=int, dest='nproc',
+                        default=1,
+                        help='number of processes (0: all cores)')
+    parser.add_argument('-d', '--dry-run', action='store_true', dest='dry_run',
+                        help='print the changes without writing')
+
+    args = parser.parse_args()
+
+
+    # banner
+
+    banner = [
+        f"",
+        f"     {os.path.basename(__file__)}",
+        f"",
+        f"       Summary of arguments",
+        f""
+    ]
+
+    banner += [
+        f"         {attr:<20}: {getattr(args, attr)}"
+        for attr in dir(args)
+        if not attr.startswith('_')
+    ]
+
+    print("\n".join(banner) + "\n")
+
+    return args
+
+
+#===============================================================================
+# Main
+#==============================================================================
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    recipe = Recipe.from_file(args.recipe)
+    seeds = find_seeds(args.seeds)
+
+    nerrors = 0
+    for result in run_recipe(recipe, seeds, processes=args.nproc or None, write=not args.dry_run):
+        print(result.summary())
+        nerrors += result.error is not None
+
+    print(f"\n{len(seeds)} seeds, {nerrors} failed" + (" (dry run)" if args.dry_run else ""))
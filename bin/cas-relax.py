@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+import sys
+import argparse
+from castepy.relax import Relaxation
+
+
+#===============================================================================
+# Arguments
+#==============================================================================
+
+def get_args():
+    """
+    Parse arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Self-consistent geometry optimisation with repeated CASTEP runs (castep_relax)",
+        epilog="examples:\n"
+               "    cas-relax.py -s Ni -m 100 -e 'mpirun -n 16 castep.mpi'\n"
+               "    cas-relax.py -s Ni -m 100 -e castep.serial --sim 0.05 --symm 0.1\n"
+               "    cas-relax.py -s Ni -m 100 -e castep.serial -w     # without the short runs\n"
+    )
+    parser.add_argument('-s', '--seed', type=str, dest='seed',
+                        default=None,
+                        help='seed')
+    parser.add_argument('-m', '--maxit', type=int, dest='maxit',
+                        default=0,
+                        help='geometry iterations in total (<0: single point energy, 0: one run)')
+    parser.add_argument('-e', '--exe', type=str, dest='exe',
+                        default='castep.serial',
+                        help='CASTEP command, the seed is appended')
+    parser.add_argument('--sim', type=float, dest='sim',
+                        default=0.0,
+                        help='stop if the structure is in the directory within this fingerprint distance (0: off)')
+    parser.add_argument('--symm', type=float, dest='symm',
+                        default=0.0,
+                        help='symmetrise with this tolerance after every run (0: off)')
+    parser.add_argument('-w', '--woshort', action='store_true', dest='woshort',
+                        help='without the three short runs')
+    parser.add_argument('-i', '--interval', type=float, dest='interval',
+                        default=1.0,
+                        help='seconds between reads of the running output')
+
+    return parser.parse_args()
+
+
+#===============================================================================
+# Main
+#==============================================================================
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    try:
+        relaxation = Relaxation(
+            args.seed, args.exe, maxit=args.maxit, sim=args.sim, symm=args.symm,
+            short_runs=not args.woshort, interval=args.interval
+        )
+    except ImportError as e:
+        sys.exit(f"cas-relax.py: --symm {args.symm}: {e}")
+    status = relaxation.relax()
+
+    # a crashed run or a known structure is not an error for the caller
+    if status != 'converged':
+        print(f"{args.seed}: {status}", file=sys.stderr)
+        sys.exit(0)
+
+    summary = relaxation.summary()
+    for name in ['pressure', 'enthalpy', 'volume']:
+        if summary[name] is not None:
+            print(f"{name.capitalize() + ': ':<20}{summary[name]:10.8f}")
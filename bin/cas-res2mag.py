@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+import os
+import glob
+import argparse
+from castepy.resmag import aggregate
+from castepy.cache import ParseCache
+
+
+#===============================================================================
+# Arguments
+#==============================================================================
+
+def get_args():
+    """
+    Parse arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Per-element mean spin and |spin|, enthalpy, volume and symmetry of .res files",
+        epilog="examples:\n"
+               "    cas-res2mag.py -o df_mag.csv\n"
+               "    cas-res2mag.py -d airss -o mag.parquet -e Ni Co O -n 64\n"
+               "    cas-res2mag.py -d airss -o mag.parquet -e Ni Co O     # again: continues where it stopped\n"
+    )
+    parser.add_argument('-d', '--directory', type=str, dest='directory',
+                        default='.',
+                        help='directory of .res files')
+    parser.add_argument('-o', '--output', type=str, dest='output',
+                        default='df_mag.csv',
+                        help='output (.csv, or .parquet dataset directory)')
+    parser.add_argument('-e', '--elements', type=str, nargs='+', dest='elements',
+                        default=None,
+                        help='elements of the first per-element columns (others are added as they appear)')
+    parser.add_argument('-n', '--nproc', type=int, dest='nproc',
+                        default=None,
+                        help='number of processes (default: all cores)')
+    parser.add_argument('-b', '--batch', type=int, dest='batch',
+                        default=10000,
+                        help='rows written at a time')
+    parser.add_argument('--no-cache', action='store_false', dest='cache',
+                        help='read every file again even if the parse cache has its summary (see cas-cache.py)')
+
+    args = parser.parse_args()
+
+
+    # banner
+
+    banner = [
+        f"",
+        f"     {os.path.basename(__file__)}",
+        f"",
+        f"       Summary of arguments",
+        f""
+    ]
+
+    banner += [
+        f"         {attr:<20}: {getattr(args, attr)}"
+        for attr in dir(args)
+        if not attr.startswith('_')
+    ]
+
+    print("\n".join(banner) + "\n")
+
+    return args
+
+
+#===============================================================================
+# Main
+#==============================================================================
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    files = sorted(glob.glob(os.path.join(args.directory, '*.res')))
+
+    cache = ParseCache() if args.cache else None
+    try:
+        ndone, nerrors, nskipped = aggregate(
+            files, args.output, elements=args.elements,
+            processes=args.nproc, batch_size=args.batch, cache=cache
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+
+    print(f"{ndone} .res files summarised into {args.output} ({nerrors} failed, {nskipped} already there)")
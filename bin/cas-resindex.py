@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+import argparse
+from castepy.resindex import ResIndex
+
+
+#===============================================================================
+# Arguments
+#==============================================================================
+
+def get_args():
+    """
+    Parse arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Index a directory of AIRSS .res files (SQLite) and rank structures by enthalpy",
+        epilog="examples:\n"
+               "    cas-resindex.py -d airss -u                      # (re)index new and changed files\n"
+               "    cas-resindex.py -d airss -f LiCoO2 -n 50 -w 0.1   # lowest 50 within 0.1 eV/atom\n"
+               "    cas-resindex.py -d airss -l                      # compositions\n"
+    )
+    parser.add_argument('-d', '--directory', type=str, dest='directory',
+                        default='.',
+                        help='directory of .res files')
+    parser.add_argument('-i', '--index', type=str, dest='index',
+                        default=None,
+                        help='index file (default: <directory>/.castepy/res.sqlite)')
+    parser.add_argument('-u', '--update', action='store_true', dest='update',
+                        help='update the index before the query')
+    parser.add_argument('-f', '--formula', type=str, dest='formula',
+                        default=None,
+                        help='composition')
+    parser.add_argument('-p', '--pressure', type=float, dest='pressure',
+                        default=None,
+                        help='pressure (GPa)')
+    parser.add_argument('-n', '--number', type=int, dest='number',
+                        default=20,
+                        help='number of structures')
+    parser.add_argument('-w', '--window', type=float, dest='window',
+                        default=None,
+                        help='enthalpy window above the lowest (eV/atom)')
+    parser.add_argument('-l', '--list', action='store_true', dest='list',
+                        help='list the compositions in the index')
+    parser.add_argument('-N', '--nproc', type=int, dest='nproc',
+                        default=1,
+                        help='number of processes to parse new files (0: all cores)')
+
+    return parser.parse_args()
+
+
+#===============================================================================
+# Main
+#==============================================================================
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    index = ResIndex(args.index) if args.index else ResIndex.for_directory(args.directory)
+
+    with index:
+        if args.update:
+            nindexed, nremoved = index.update(args.directory, processes=args.nproc or None)
+            print(f"{nindexed} files indexed, {nremoved} removed")
+
+        if args.list:
+            for formula, count in index.formulas().items():
+                print(f"{formula:<20} {count:>8}")
+        else:
+            rows = index.lowest(args.number, formula=args.formula, window=args.window, pressure=args.pressure)
+            if rows:
+                lowest = rows[0]['enthalpy_per_atom']
+            print(f"{'seed':<30} {'formula':<12} {'P(GPa)':>8} {'V(A^3)':>10} {'H(eV/atom)':>14} "
+                  f"{'dH':>8} {'spin':>7} {'|spin|':>7} {'nat':>5}  sym")
+            for row in rows:
+                print(f"{row['seed']:<30} {row['formula']:<12} {row['pressure']:>8.2f} {row['volume']:>10.3f} "
+                      f"{row['enthalpy_per_atom']:>14.6f} {row['enthalpy_per_atom'] - lowest:>8.4f} "
+                      f"{row['spin']:>7.2f} {row['modspin']:>7.2f} {row['natoms']:>5}  {row['sym']}")
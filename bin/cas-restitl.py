@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+import argparse
+from castepy.res import retitle_dir
+
+
+#===============================================================================
+# Arguments
+#==============================================================================
+
+def get_args():
+    """
+    Parse arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Set the seed in the TITL record of every .res file to its file name",
+        epilog="examples:\n"
+               "    cas-restitl.py\n"
+               "    cas-restitl.py -d airss -t 16      # threads for networked filesystems\n"
+    )
+    parser.add_argument('-d', '--directory', type=str, dest='directory',
+                        default='.',
+                        help='directory of .res files')
+    parser.add_argument('-t', '--threads', type=int, dest='threads',
+                        default=None,
+                        help='number of I/O threads (default: none)')
+
+    return parser.parse_args()
+
+
+#===============================================================================
+# Main
+#==============================================================================
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    counts = retitle_dir(args.directory, threads=args.threads)
+
+    print(", ".join(f"{count} {outcome}" for outcome, count in counts.items()))
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+import os
+import math
+import argparse
+from castepy.scf import Scf
+
+
+#===============================================================================
+# Arguments
+#==============================================================================
+
+def get_args():
+    """
+    Parse arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="SCF convergence and timing of CASTEP runs, per SCF loop",
+        epilog="examples:\n"
+               "    cas-scf.py -s Ni\n"
+               "    cas-scf.py -s Ni-pulay Ni-broyden -c     # compare mixing schemes\n"
+               "    cas-scf.py -s Ni -o                      # write Ni-scf.dat (every cycle)\n"
+    )
+    parser.add_argument('-s', '--seeds', type=str, nargs='+', dest='seeds',
+                        default=None,
+                        help='seeds')
+    parser.add_argument('-c', '--compare', action='store_true', dest='compare',
+                        help='one summary line per seed only')
+    parser.add_argument('-o', '--output', action='store_true', dest='output',
+                        help='write every SCF cycle to {seed}-scf.dat')
+
+    args = parser.parse_args()
+
+
+    # banner
+
+    banner = [
+        f"",
+        f"     {os.path.basename(__file__)}",
+        f"",
+        f"       Summary of arguments",
+        f""
+    ]
+
+    banner += [
+        f"         {attr:<20}: {getattr(args, attr)}"
+        for attr in dir(args)
+        if not attr.startswith('_')
+    ]
+
+    print("\n".join(banner) + "\n")
+
+    return args
+
+
+#===============================================================================
+# Funcitons
+#==============================================================================
+
+def mean(values):
+    values = [value for value in values if not math.isnan(value)]
+    return sum(values) / len(values) if values else math.nan
+
+
+def print_loops(seed, summary):
+    print(f"{seed}")
+    print(f"{'run':>4} {'loop':>5} {'step':>5} {'ncycles':>8} {'energy(eV)':>18} {'s/cycle':>10} {'rate':>8}")
+    for loop in summary:
+        print(f"{loop['run']:>4} {loop['loop']:>5} {loop['step']:>5} {loop['ncycles']:>8} "
+              f"{loop['energy']:>18.8f} {loop['seconds_per_cycle']:>10.2f} {loop['convergence_rate']:>8.3f}")
+    print()
+
+
+def print_totals(seeds, summaries):
+    print(f"{'seed':<30} {'nloops':>7} {'ncycles':>8} {'cycles/loop':>12} {'s/cycle':>10} {'rate':>8}")
+    for seed, summary in zip(seeds, summaries):
+        ncycles = sum(loop['ncycles'] for loop in summary)
+        print(f"{seed:<30} {len(summary):>7} {ncycles:>8} "
+              f"{ncycles / len(summary) if summary else math.nan:>12.2f} "
+              f"{mean(loop['seconds_per_cycle'] for loop in summary):>10.2f} "
+              f"{mean(loop['convergence_rate'] for loop in summary):>8.3f}")
+
+
+def write_cycles(seed, scf):
+    with open(f"{seed}-scf.dat", 'w') as f:
+        f.write(" ".join(scf.data.dtype.names) + "\n")
+        for row in scf.data:
+            f.write(" ".join(f"{value}" for value in row.tolist()) + "\n")
+
+
+#===============================================================================
+# Main
+#==============================================================================
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    summaries = []
+    for seed in args.seeds:
+        scf = Scf.from_seed(seed)
+        summary = scf.summary()
+        summaries.append(summary)
+        if not args.compare:
+            print_loops(seed, summary)
+        if args.output:
+            write_cycles(seed, scf)
+
+    print_totals(args.seeds, summaries)
+    print("\n  rate: slope of log10|energy gain per atom| per SCF cycle (more negative is faster)")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+import argparse
+from castepy.cell import Cell
+from castepy.res import Res, res_from_cell
+from castepy.similarity import FingerprintIndex
+
+
+#===============================================================================
+# Arguments
+#==============================================================================
+
+def get_args():
+    """
+    Parse arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Find structures already in a directory of .res files (pair-distance fingerprints)",
+        epilog="examples:\n"
+               "    cas-similar.py -d airss -u                     # fingerprint new and changed files\n"
+               "    cas-similar.py -d . -i Ni-out.cell -t 0.05 -u   # seeds of the same structure, closest first\n"
+    )
+    parser.add_argument('-d', '--directory', type=str, dest='directory',
+                        default='.',
+                        help='directory of .res files')
+    parser.add_argument('-x', '--index', type=str, dest='index',
+                        default=None,
+                        help='index file (default: <directory>/.castepy/fingerprint.sqlite)')
+    parser.add_argument('-i', '--input', type=str, dest='input',
+                        default=None,
+                        help='structure to look up (.cell or .res)')
+    parser.add_argument('-t', '--tolerance', type=float, dest='tolerance',
+                        default=0.05,
+                        help='fingerprint distance (0: same, 1: nothing in common)')
+    parser.add_argument('-v', '--volume', type=float, dest='volume',
+                        default=0.05,
+                        help='only compare structures within this fraction of the volume per atom (0 or less: all)')
+    parser.add_argument('-u', '--update', action='store_true', dest='update',
+                        help='update the index before the lookup')
+    parser.add_argument('-N', '--nproc', type=int, dest='nproc',
+                        default=1,
+                        help='number of processes to fingerprint new files (0: all cores)')
+
+    return parser.parse_args()
+
+
+#===============================================================================
+# Main
+#==============================================================================
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    index = FingerprintIndex(args.index) if args.index else FingerprintIndex.for_directory(args.directory)
+
+    with index:
+        if args.update:
+            nindexed, nremoved = index.update(args.directory, processes=args.nproc or None)
+            if args.input is None:
+                print(f"{nindexed} files indexed, {nremoved} removed")
+
+        if args.input is not None:
+            if args.input.endswith('.res'):
+                res = Res.from_file(args.input)
+            else:
+                res = res_from_cell(Cell.from_file(args.input))
+            for path, seed, distance in index.find(
+                res, args.tolerance, exclude=res.seed, volume=args.volume if args.volume > 0 else None
+            ):
+                print(f"{seed} {distance:.5f}")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+import os
+import argparse
+from castepy.snapshot import SnapshotStore, find_root
+
+
+#===============================================================================
+# Arguments
+#==============================================================================
+
+def get_args():
+    """
+    Parse arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Snapshot CASTEP inputs into the project store (.castepy/snapshots), list and restore them",
+        epilog="examples:\n"
+               "    cas-snapshot.py -m save -f *.cell *.param\n"
+               "    cas-snapshot.py -m list\n"
+               "    cas-snapshot.py -m list -f Ni.cell\n"
+               "    cas-snapshot.py -m restore -f Ni.cell              # latest snapshot\n"
+               "    cas-snapshot.py -m restore -f Ni.cell -r 3fa2 -o Ni-old.cell\n"
+    )
+    parser.add_argument('-m', '--mode', type=str, dest='mode',
+                        default='list', choices=['save', 'list', 'restore'],
+                        help='mode')
+    parser.add_argument('-f', '--files', type=str, nargs='+', dest='files',
+                        default=[],
+                        help='input files')
+    parser.add_argument('-r', '--hash', type=str, dest='hash',
+                        default=None,
+                        help='(prefix of the) hash of the snapshot to restore (default: latest)')
+    parser.add_argument('-o', '--output', type=str, dest='output',
+                        default=None,
+                        help='restore to this file instead of the original')
+    parser.add_argument('-l', '--link', action='store_true', dest='link',
+                        help='hard link new objects to the inputs (only if inputs are never edited in place)')
+
+    return parser.parse_args()
+
+
+#===============================================================================
+# Main
+#==============================================================================
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    store = SnapshotStore(find_root(args.files[0] if args.files else '.'), link=args.link)
+
+    if args.mode == 'save':
+        for filename, hash in zip(args.files, store.save(args.files)):
+            print(f"{hash[:12]}  {filename}")
+
+    elif args.mode == 'list':
+        snapshots = []
+        for filename in args.files or [None]:
+            snapshots += store.history(filename)
+        for s in snapshots:
+            print(f"{s.timestamp}  {s.hash[:12]}  {s.path}")
+
+    elif args.mode == 'restore':
+        for filename in args.files:
+            hash = store.restore(filename, hash=args.hash, output=args.output)
+            print(f"{hash[:12]} -> {args.output or filename}")
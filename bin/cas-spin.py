@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+
+import argparse
+import numpy as np
+from castepy.cell import Cell
+from castepy.files import set_keyword
+
+
+#===============================================================================
+# Arguments
+#==============================================================================
+
+def get_args():
+    """
+    Parse arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Set SPIN in .param to the sum of the initial spins (SPIN=) in .cell",
+        epilog="examples:\n"
+               "    cas-spin.py -s Ni\n"
+               "    cas-spin.py -s $(ls *.param | sed 's/.param$//')\n"
+    )
+    parser.add_argument('-s', '--seeds', type=str, nargs='+', dest='seeds',
+                        default=None,
+                        help='seeds')
+    parser.add_argument('-n', '--nproc', type=int, dest='nproc',
+                        default=1,
+                        help='number of processes to read the inputs (0: all cores)')
+
+    return parser.parse_args()
+
+
+#===============================================================================
+# Main
+#==============================================================================
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    cells = Cell.load_many([f"{seed}.cell" for seed in args.seeds], processes=args.nproc or None)
+
+    # only the spin line of the .param is changed, as param-spin did with grep
+    for seed, cell in zip(args.seeds, cells):
+        spins = cell.spins
+        total = 0 if spins is None else np.nansum(spins)
+        written = set_keyword(f"{seed}.param", 'spin', f"{total:g}")
+        print(f"{seed}.param" + ("" if written else " (unchanged)"))
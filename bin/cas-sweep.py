@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+import glob
+import argparse
+from castepy.sweep import run_sweep, run_adaptive, run_map, sweep_values, mp_grids, ShellExecutor
+
+
+#===============================================================================
+# Arguments
+#==============================================================================
+
+def get_args():
+    """
+    Parse arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Convergence sweep of a CASTEP seed with concurrent runs (castep-conv.csv)",
+        epilog="examples:\n"
+               "    cas-sweep.py -k cut_off_energy -f 300 -l 1000 -i 50 -w 4\n"
+               "    cas-sweep.py -k kpoints_mp_spacing -f 0.07 -l 0.01 -i -0.005 -w 8\n"
+               "    cas-sweep.py -k fine_grid_scale -f 2.0 -l 3.0 -i 0.1 -c 'python fake.py {seed}'\n"
+               "    cas-sweep.py -k cut_off_energy -f 300 -l 1000 -i 50 -t 1 -n 2   # stop within 1 meV/atom\n"
+               "    cas-sweep.py -k cut_off_energy -f 300 -l 1000 -i 50 --fgs 2.0 3.0 0.1 -t 1 -w 4\n"
+               "                                   # adaptive cut-off x fine grid scale map (castep-conv-map.csv)\n"
+    )
+    parser.add_argument('-s', '--seed', type=str, dest='seed',
+                        default=None,
+                        help='seed (default: that of the only .param)')
+    parser.add_argument('-k', '--keyword', type=str, dest='keyword',
+                        default='cut_off_energy',
+                        help='cut_off_energy, fine_grid_scale or kpoints_mp_spacing')
+    parser.add_argument('-f', '--first', type=float, dest='first',
+                        default=None,
+                        help='first value')
+    parser.add_argument('-l', '--last', type=float, dest='last',
+                        default=None,
+                        help='last value')
+    parser.add_argument('-i', '--increment', type=float, dest='increment',
+                        default=None,
+                        help='increment')
+    parser.add_argument('-w', '--workers', type=int, dest='workers',
+                        default=1,
+                        help='concurrent CASTEP runs, the cores are split between them')
+    parser.add_argument('-t', '--tolerance', type=float, dest='tolerance',
+                        default=None,
+                        help='stop once the energy is converged within this (meV/atom) and set the value')
+    parser.add_argument('-n', '--window', type=int, dest='window',
+                        default=2,
+                        help='number of further values the energy has to stay within tolerance')
+    parser.add_argument('--stress', type=float, dest='stress',
+                        default=None,
+                        help='pressure tolerance (GPa) for convergence too')
+    parser.add_argument('--force', type=float, dest='force',
+                        default=None,
+                        help='largest force tolerance (eV/A) for convergence too')
+    parser.add_argument('--fgs', type=float, nargs=3, dest='fgs',
+                        default=None, metavar=('FIRST', 'LAST', 'INCREMENT'),
+                        help='map fine_grid_scale too: adaptive 2D map, refined where interpolation is off by more than -t')
+    parser.add_argument('--coarse', type=int, dest='coarse',
+                        default=4,
+                        help='every how many values the 2D map starts with')
+    parser.add_argument('--no-write', action='store_true', dest='no_write',
+                        help='do not set the converged value in the inputs')
+    parser.add_argument('-c', '--command', type=str, dest='command',
+                        default="taskset -c {cores} mpirun -n {ncores} castep.mpi {seed}",
+                        help='CASTEP command ({seed}, {ncores}, {cores})')
+
+    return parser.parse_args()
+
+
+#===============================================================================
+# Main
+#==============================================================================
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    seed = args.seed
+    if seed is None:
+        params = glob.glob('*.param')
+        if len(params) != 1:
+            raise SystemExit("check the param file")
+        seed = params[0][:-len('.param')]
+
+    values = sweep_values(args.keyword, args.first, args.last, args.increment)
+
+    print(f"keyword   :{args.keyword}")
+    print(f"values    :{' '.join(values)}")
+    print(f"workers   :{args.workers}")
+    if args.keyword.lower() == 'kpoints_mp_spacing':
+        # spacings giving the same grid are run once
+        grids = mp_grids(seed, values)
+        print(f"grids     :{len(set(grids.values()))} distinct of {len(values)}")
+        for value, grid in grids.items():
+            print(f"    {value}  {' '.join(str(n) for n in grid)}")
+
+    def report(value, row):
+        energy = 'failed' if row is None else f"{row['energy(eV/atom)']:.8f} eV/atom"
+        print(f"{args.keyword} {value}: {energy}", flush=True)
+
+    if args.fgs is not None:
+        fgs = sweep_values('fine_grid_scale', *args.fgs)
+        print(f"fine_grid_scale :{' '.join(fgs)}")
+        energy, sampled = run_map(
+            seed, (args.keyword, 'fine_grid_scale'), (values, fgs),
+            tolerance=args.tolerance or 1.0, coarse=args.coarse,
+            nworkers=args.workers, executor=ShellExecutor(args.command)
+        )
+        print(f"{sampled.sum()} of {sampled.size} points run, the rest interpolated (castep-conv-map.csv)")
+    elif args.tolerance is None:
+        run_sweep(
+            seed, args.keyword, values, nworkers=args.workers,
+            executor=ShellExecutor(args.command), callback=report
+        )
+    else:
+        value, rows = run_adaptive(
+            seed, args.keyword, values, tolerance=args.tolerance, window=args.window,
+            stress=args.stress, force=args.force, write=not args.no_write,
+            nworkers=args.workers, executor=ShellExecutor(args.command), callback=report
+        )
+        if value is None:
+            print(f"not converged within {args.tolerance} meV/atom after {len(rows)} of {len(values)} values")
+        else:
+            written = "" if args.no_write else f" (set in {seed})"
+            print(f"converged: {args.keyword} {value}{written}, {len(rows)} of {len(values)} values done")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+import argparse
+from castepy.cell import Cell
+from castepy.res import Res, res_from_cell, cell_from_res
+from castepy.symmetry import SymmetryCache
+
+
+#===============================================================================
+# Arguments
+#==============================================================================
+
+def get_args():
+    """
+    Parse arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Space groups of .cell/.res structures and symmetrisation (spglib), cached by structure",
+        epilog="examples:\n"
+               "    cas-symmetry.py -i *.res -N 8                          # space groups\n"
+               "    cas-symmetry.py -i Ni-out.cell -s 0.1 -o Ni-out.cell   # symmetrise in place\n"
+               "    cas-symmetry.py -i Ni.res -o Ni-sym.res\n"
+    )
+    parser.add_argument('-i', '--input', type=str, nargs='+', dest='input',
+                        default=[],
+                        help='structures (.cell or .res)')
+    parser.add_argument('-s', '--symprec', type=float, dest='symprec',
+                        default=0.1,
+                        help='tolerance (A)')
+    parser.add_argument('-o', '--output', type=str, dest='output',
+                        default=None,
+                        help='symmetrised structure of a single input (.cell or .res)')
+    parser.add_argument('-x', '--cache', type=str, dest='cache',
+                        default='.castepy/symmetry.sqlite',
+                        help="cache file ('' for none)")
+    parser.add_argument('-N', '--nproc', type=int, dest='nproc',
+                        default=1,
+                        help='number of processes (0: all cores)')
+
+    return parser.parse_args()
+
+
+#===============================================================================
+# Funcitons
+#==============================================================================
+
+def read(filename: str) -> Res:
+    if filename.endswith('.res'):
+        return Res.from_file(filename)
+    return res_from_cell(Cell.from_file(filename))
+
+
+def write(structure: Res, filename: str, template: str):
+    """
+    Write a symmetrised structure; a .cell keeps everything but the lattice
+    and positions of the .cell it came from
+    """
+    if not filename.endswith('.cell'):
+        structure.to_file(filename)
+        return
+    cell = cell_from_res(structure, seed=filename[:-len('.cell')])
+    if template.endswith('.cell'):
+        original = Cell.from_file(template)
+        original.set_structure(cell)
+        cell = original
+    cell.to_file(filename, force=True)
+
+
+#===============================================================================
+# Main
+#==============================================================================
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    if args.output is not None and len(args.input) != 1:
+        raise SystemExit("-o needs a single input")
+
+    structures = [read(filename) for filename in args.input]
+
+    with SymmetryCache(args.cache or None) as cache:
+        results = cache.analyse(structures, args.symprec, processes=args.nproc or None)
+
+    for filename, result in zip(args.input, results):
+        structure = result['structure']
+        nat = len(structure.species) if structure is not None else 0
+        print(f"{filename:<40} {result['number'] or 0:>4} {result['international'] or '-':<12} {nat:>5}")
+
+    if args.output is not None:
+        if results[0]['structure'] is None:
+            raise SystemExit(f"no symmetry found for {args.input[0]}")
+        write(results[0]['structure'], args.output, args.input[0])
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+import os
+import argparse
+from castepy.trajectory import Trajectory
+
+
+#===============================================================================
+# Arguments
+#==============================================================================
+
+def get_args():
+    """
+    Parse arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Export geometry optimisation trajectories of CASTEP runs",
+        epilog="examples:\n"
+               "    cas-traj.py -s Ni\n"
+               "    cas-traj.py -s Ni Co -e parquet\n"
+    )
+    parser.add_argument('-s', '--seed', type=str, dest='seeds', nargs='+',
+                        default=[],
+                        help='seed(s)')
+    parser.add_argument('-e', '--ext', type=str, dest='ext',
+                        default='csv', choices=['csv', 'npz', 'parquet'],
+                        help='output format, written to <seed>-traj.<ext>')
+
+    args = parser.parse_args()
+
+
+    # banner
+
+    banner = [
+        f"",
+        f"     {os.path.basename(__file__)}",
+        f"",
+        f"       Summary of arguments",
+        f""
+    ]
+
+    banner += [
+        f"         {attr:<20}: {getattr(args, attr)}"
+        for attr in dir(args)
+        if not attr.startswith('_')
+    ]
+
+    print("\n".join(banner) + "\n")
+
+    return args
+
+
+#===============================================================================
+# Main
+#==============================================================================
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    for seed in args.seeds:
+        traj = Trajectory.from_seed(seed)
+        traj.to_file(f"{seed}-traj.{args.ext}")
+        print(f"{seed}.castep: {len(traj)} steps -> {seed}-traj.{args.ext}")
@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 
+import os
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 import matplotlib.colors as colors
@@ -26,6 +27,10 @@ def main():
     plot_e_fgs(df=df)
     plot_e_cut(df=df)
 
+    # adaptive 2D map (castep-wf-conv ... --fgs first last increment)
+    if os.path.exists("castep-conv-map.csv"):
+        plot_2d(pd.read_csv("castep-conv-map.csv"))
+
 
 def plot_e_fgs(df=None):
 
@@ -114,9 +119,11 @@ def plot_e_cut(df):
     
 
 
-def plot_2d():
-    print('minimum cutoff:',df[colcut].min())
-    print('maximum cutoff:',df[colcut].max())
+def plot_2d(df):
+
+    print('plot energy map of cutoff energy and fine grid scale...')
+    print('minimum cutoff:',df[col_cut].min())
+    print('maximum cutoff:',df[col_cut].max())
     
     #df = df.loc[df[cut] >= 350]
     
@@ -124,29 +131,28 @@ def plot_2d():
     coly = 'fine_grid_scale'
     colz = 'energy(eV/atom)'
     
-    df = df.pivot(columns=colx, index=coly, values=colz)
+    # points run by castep-wf-conv --fgs (castep-conv-map.csv), the rest is interpolated
+    sampled = df.loc[df['sampled'] == 1] if 'sampled' in df else df
+
+    df = df.pivot_table(columns=colx, index=coly, values=colz)
     print(df)
     
     X = df.columns.values
     Y = df.index.values
     Z = df.values
-    #print(X)
-    #print(Y)
-    #print(Z)
     x,y=np.meshgrid(X,Y)
-    Z = (Z-Z.min()) * 1000
-    #print(x)
-    #print(y)
-    
-    
-    
+    Zmin = np.nanmin(Z)
+    Z = (Z-Zmin) * 1000
     
+    cm = 1/2.54
+    plt.rc('font', size=14)
+
     fig, ax = plt.subplots()
     
     fig.set_size_inches(14*cm, 14/1.24*cm)
     
-    ax.set_xlabel('Cutoff energy (eV)', fontsize=fontsize)
-    ax.set_ylabel('Fine grid scale', fontsize=fontsize)
+    ax.set_xlabel('Cutoff energy (eV)')
+    ax.set_ylabel('Fine grid scale')
     
     
     # colors
@@ -158,10 +164,13 @@ def plot_2d():
     
     #ax.contourf(x,y,Z, cmap="Spectral_r")
     plot = ax.pcolormesh(x,y,Z, cmap=cmap, norm=norm)
-    #ax.pcolormesh(x,y,Z, cmap="Spectral_r", norm=colors.LogNorm(vmin=0.1, vmax=10))
+    ax.plot(sampled[colx], sampled[coly], linestyle='none', marker='.', markersize=2, color='k')
     
     # colorbar
     cbar = plt.colorbar(plot,ax=ax) 
+    cbar.set_label('Energy - min (meV/atom)')
+
+    fig.savefig("castep-conv-map.png", bbox_inches="tight")
 
 
 ##################################################
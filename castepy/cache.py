@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+
+import os
+import json
+import time
+import sqlite3
+
+from .castep import CastepRun, parse
+
+
+def default_cache_file() -> str:
+    """
+    $CASTEPY_CACHE, or parse.sqlite in $XDG_CACHE_HOME/castepy (~/.cache/castepy)
+    """
+    if 'CASTEPY_CACHE' in os.environ:
+        return os.environ['CASTEPY_CACHE']
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache_home, 'castepy', 'parse.sqlite')
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed summary records (SQLite)
+
+    Records are keyed by absolute path and kind (e.g. 'castep', 'res') and
+    are only valid for the file identity (size, mtime, inode) they were
+    parsed from, so a file that grows or is replaced is parsed again.
+    Stale and unused records are removed explicitly with prune() and evict().
+    """
+
+    def __init__(self, filename: str | None = None):
+        self.filename = filename or default_cache_file()
+        os.makedirs(os.path.dirname(os.path.abspath(self.filename)), exist_ok=True)
+        self.db = sqlite3.connect(self.filename, timeout=60)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS records (
+                path TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                accessed REAL NOT NULL,
+                record TEXT NOT NULL,
+                PRIMARY KEY (path, kind)
+            )
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    @ staticmethod
+    def _identity(path: str) -> tuple[int, int, int]:
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+    def get(self, path: str, kind: str):
+        """
+        Cached record of path, or None if there is none for the file as it is now
+        """
+        path = os.path.abspath(path)
+        try:
+            identity = self._identity(path)
+        except OSError:
+            return None
+
+        row = self.db.execute(
+            "SELECT size, mtime_ns, inode, record FROM records WHERE path = ? AND kind = ?",
+            (path, kind)
+        ).fetchone()
+        if row is None or tuple(row[:3]) != identity:
+            return None
+
+        self.db.execute(
+            "UPDATE records SET accessed = ? WHERE path = ? AND kind = ?",
+            (time.time(), path, kind)
+        )
+        return json.loads(row[3])
+
+    def put(self, path: str, kind: str, record, identity: tuple[int, int, int] | None = None):
+        """
+        Store a JSON-serialisable record; pass the identity taken before parsing
+        so that a file modified while it was parsed is not cached as up to date
+        """
+        path = os.path.abspath(path)
+        size, mtime_ns, inode = identity or self._identity(path)
+        self.db.execute(
+            "INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (path, kind, size, mtime_ns, inode, time.time(), json.dumps(record))
+        )
+
+    def cached(self, path: str, kind: str, func):
+        """
+        get() the record of path, or compute it with func(path) and put() it
+        """
+        record = self.get(path, kind)
+        if record is None:
+            identity = self._identity(path)
+            record = func(path)
+            self.put(path, kind, record, identity=identity)
+        return record
+
+    def prune(self) -> int:
+        """
+        Remove records of files that no longer exist or have changed since
+        """
+        stale = []
+        for path, kind, size, mtime_ns, inode in self.db.execute(
+            "SELECT path, kind, size, mtime_ns, inode FROM records"
+        ).fetchall():
+            try:
+                if self._identity(path) != (size, mtime_ns, inode):
+                    stale.append((path, kind))
+            except OSError:
+                stale.append((path, kind))
+
+        self.db.executemany("DELETE FROM records WHERE path = ? AND kind = ?", stale)
+        self.db.commit()
+        return len(stale)
+
+    def evict(self, days: float) -> int:
+        """
+        Remove records not used for the given number of days
+        """
+        cursor = self.db.execute(
+            "DELETE FROM records WHERE accessed < ?", (time.time() - days * 86400,)
+        )
+        self.db.commit()
+        return cursor.rowcount
+
+    def clear(self) -> int:
+        cursor = self.db.execute("DELETE FROM records")
+        self.db.commit()
+        return cursor.rowcount
+
+    def stats(self) -> dict[str, int]:
+        return dict(self.db.execute(
+            "SELECT kind, COUNT(*) FROM records GROUP BY kind"
+        ).fetchall())
+
+
+def _parse_records(path: str) -> list[dict]:
+    return [run.as_dict() for run in parse(path)]
+
+
+def parse_cached(path: str, cache: ParseCache | None = None) -> list[CastepRun]:
+    """
+    castep.parse() through the cache
+    """
+    if cache is None:
+        return parse(path)
+    return [CastepRun(**record) for record in cache.cached(path, 'castep', _parse_records)]
@@ -0,0 +1,720 @@
+#!/usr/bin/env python
+
+import os
+import json
+import math
+import mmap
+from dataclasses import dataclass, fields
+
+from .mulliken import mulliken_row
+
+
+BANNER = 'CCC   AA    SSS  TTTTT  EEEEE  PPPP'
+BANNER_BYTES = BANNER.encode()
+
+
+def _str(value: str) -> str:
+    return value.strip()
+
+def _first(value: str) -> str:
+    tokens = value.split()
+    return tokens[0] if tokens else ''
+
+def _float(value: str) -> float:
+    return float(value.split()[0])
+
+def _int(value: str) -> int:
+    return int(value.split()[0])
+
+def _xc_functional(value: str) -> str:
+    value = value.strip()
+    return {
+        'Perdew Burke Ernzerhof': 'PBE',
+        'PBE for solids (2008)': 'PBESOL',
+    }.get(value, value)
+
+
+@dataclass
+class CastepRun:
+    """
+    Summary of a single CASTEP run, i.e. everything between two banners
+    of a (possibly concatenated) .castep file.
+
+    Fields are None when the corresponding line was not found.
+    """
+
+    # General Parameters
+    task: str | None = None
+    calculate_stress: str | None = None
+
+    # Exchange-Correlation Parameters
+    xc_functional: str | None = None
+    sedc_scheme: str = 'off'
+
+    # Basis Set Parameters
+    cut_off_energy: float | None = None
+    grid_scale: float | None = None
+    fine_grid_scale: float | None = None
+    finite_basis_corr: str | None = None
+
+    # Electronic Parameters
+    nelectrons: float | None = None
+    spin: float | None = None
+    spin_polarized: str = 'false'
+    nbands: int | None = None
+
+    # Electronic Minimization Parameters
+    metals_method: str | None = None
+    elec_energy_tol: float | None = None
+    smearing_width: float | None = None
+    dipole_correction: str | None = None
+    dipole_dir: str | None = None
+
+    # Geometry Optimization Parameters
+    fixed_npw: str | None = None
+    geom_spin_fix: str | None = None
+    geom_energy_tol: float | None = None
+    geom_force_tol: float | None = None
+    geom_disp_tol: float | None = None
+    geom_stress_tol: float | None = None
+
+    # Unit Cell (input)
+    a: float | None = None
+    b: float | None = None
+    c: float | None = None
+    alpha: float | None = None
+    beta: float | None = None
+    gamma: float | None = None
+    volume: float | None = None
+    density: float | None = None
+
+    # Cell Contents, Details of Species, k-Points, Symmetry and Constraints
+    nions: int | None = None
+    hubbard: str | None = None
+    kpoints_mp_spacing: float | None = None
+    kpoints_mp_grid: str | None = None
+    symmops: int | None = None
+    spacegroup: str | None = None
+    cell_constraints: str | None = None
+
+    # Output
+    status: str | None = None
+    niter: int | None = None
+
+    # Unit Cell (final configuration)
+    final_a: float | None = None
+    final_b: float | None = None
+    final_c: float | None = None
+    final_alpha: float | None = None
+    final_beta: float | None = None
+    final_gamma: float | None = None
+    final_volume: float | None = None
+    final_density: float | None = None
+
+    enthalpy: float | None = None
+    snap_to_symmetry: str = 'false'
+    pressure: float | None = None
+    spinmom: float | None = None
+    ion_spin: str | None = None
+
+    def as_dict(self):
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+
+# "label : value" lines of the input summary, keyed by the stripped label
+HEADER_KEYS = {
+    'type of calculation': ('task', _str),
+    'stress calculation': ('calculate_stress', _str),
+    'using functional': ('xc_functional', _xc_functional),
+    'SEDC with': ('sedc_scheme', _first),
+    'plane wave basis set cut-off': ('cut_off_energy', _float),
+    'size of standard grid': ('grid_scale', _float),
+    'size of   fine   grid': ('fine_grid_scale', _float),
+    'finite basis set correction': ('finite_basis_corr', _first),
+    'number of  electrons': ('nelectrons', _float),
+    'net spin   of system': ('spin', _float),
+    'number of bands': ('nbands', _int),
+    'total energy / atom convergence tol.': ('elec_energy_tol', _float),
+    'smearing width': ('smearing_width', _float),
+    'periodic dipole correction': ('dipole_correction', _str),
+    'correcting slab dipole in direction': ('dipole_dir', _first),
+    'variable cell method': ('fixed_npw', _str),
+    'total energy convergence tolerance': ('geom_energy_tol', _float),
+    'max ionic |force| tolerance': ('geom_force_tol', _float),
+    'max ionic |displacement| tolerance': ('geom_disp_tol', _float),
+    'max |stress component| tolerance': ('geom_stress_tol', _float),
+    'Cell constraints are': ('cell_constraints', _str),
+}
+
+METALS_METHOD = {
+    'density mixing': 'dm',
+    'ensemble DFT': 'edft',
+}
+
+ENERGY_KEYS = (
+    'Final Enthalpy', 'corrected final free', 'Final free energy', 'Final energy'
+)
+
+
+class CastepParser:
+    """
+    Line-driven state machine for .castep files.
+
+    Every line is looked at exactly once, so the cost of parsing scales
+    with the size of the file rather than with the number of fields.
+    A new CastepRun is started at every CASTEP banner, hence concatenated
+    restart chains yield one record per run.
+
+    States:
+        preamble: before the Title line of the input summary
+        header:   input summary, from Title to the MEMORY estimates
+        body:     SCF cycles, geometry steps and final configuration
+    """
+
+    def __init__(self):
+        self.runs = []
+        self.run = None
+        self.state = 'preamble'
+
+        # sub-states of the header and the body
+        self.hubbard = None
+        self.mulliken = None
+        self.in_final = False
+        self.ngeom_completed = 0
+        self.ngeom_failed = 0
+        self.finished = False
+
+    @ classmethod
+    def from_file(cls, filename: str):
+        parser = cls()
+        with open(filename, 'r', errors='replace') as f:
+            for line in f:
+                parser.feed(line)
+        parser.close()
+        return parser
+
+    def feed(self, line: str):
+        if BANNER in line:
+            self.close()
+            self.run = CastepRun()
+            self.state = 'preamble'
+            return
+
+        if self.run is None:
+            return
+
+        if self.state == 'body':
+            self._feed_body(line)
+        elif self.state == 'header':
+            self._feed_header(line)
+        elif line.lstrip().startswith('*') and ' Title ' in line:
+            self.state = 'header'
+
+    def close(self):
+        """
+        Finalise the current run, if any, and append it to self.runs
+        """
+        if self.run is None:
+            return
+
+        run = self.run
+
+        if not self.finished:
+            run.status = 'ongoing'
+        elif run.task == 'single point energy':
+            run.status = 'NULL'
+        elif run.task == 'geometry optimization':
+            if self.ngeom_failed == 1:
+                run.status = 'failed'
+            elif self.ngeom_completed == 1:
+                run.status = 'completed'
+            else:
+                run.status = 'error-checkfile'
+
+        self.runs.append(run)
+
+        self.run = None
+        self.hubbard = None
+        self.mulliken = None
+        self.in_final = False
+        self.ngeom_completed = 0
+        self.ngeom_failed = 0
+        self.finished = False
+
+    # --------------------------------------------------------------------------
+    # input summary
+    # --------------------------------------------------------------------------
+
+    def _feed_header(self, line: str):
+        run = self.run
+        temp = line.strip()
+
+        if line.startswith('+-') and 'MEMORY' in line:
+            self.state = 'body'
+            return
+
+        if self.hubbard is not None:
+            self._feed_hubbard(temp)
+            return
+
+        if temp.startswith('a =') or temp.startswith('b =') or temp.startswith('c ='):
+            tokens = temp.split()
+            if getattr(run, tokens[0]) is None:
+                setattr(run, tokens[0], float(tokens[2]))
+                setattr(run, tokens[3], float(tokens[5]))
+            return
+
+        if '=' in temp:
+            key, value = temp.split('=', 1)
+            key = key.strip()
+            if key == 'Current cell volume':
+                if run.volume is None:
+                    run.volume = _float(value)
+            elif key == '' and 'g/cm^3' in value:
+                if run.density is None:
+                    run.density = _float(value)
+            elif key == 'Total number of ions in cell':
+                if run.nions is None:
+                    run.nions = _int(value)
+            elif key == 'Number of symmetry operations':
+                if run.symmops is None:
+                    run.symmops = _int(value)
+            elif key == 'Space group of crystal':
+                if run.spacegroup is None:
+                    run.spacegroup = value.split(':', 1)[-1].split(',')[0].strip()
+            return
+
+        if temp.startswith('MP grid size for SCF calculation is'):
+            if run.kpoints_mp_grid is None:
+                run.kpoints_mp_grid = temp.split(' is ', 1)[1].strip()
+            return
+
+        if temp.startswith('Hubbard U   values by orbital type'):
+            self.hubbard = []
+            return
+
+        if temp.startswith('Method:'):
+            if run.metals_method is None:
+                method = temp.split('with ', 1)[-1].split(' treatment')[0]
+                run.metals_method = METALS_METHOD.get(method, method)
+            return
+
+        if temp.startswith('treating system as spin-polarized'):
+            run.spin_polarized = 'true'
+            return
+
+        if temp.startswith('with spin'):
+            if run.geom_spin_fix is None:
+                run.geom_spin_fix = temp.split()[-1]
+            return
+
+        if ':' in temp:
+            key, value = temp.split(':', 1)
+            item = HEADER_KEYS.get(key.strip())
+            if item is not None and getattr(run, item[0]) in (None, 'off'):
+                try:
+                    setattr(run, item[0], item[1](value))
+                except (ValueError, IndexError):
+                    pass
+
+    def _feed_hubbard(self, temp: str):
+        """
+        Hubbard U table: rows between the '|--' rule and the closing 'xx' rule.
+        Only ions with a non-zero U are reported, as species:U(d)
+        """
+        if temp.startswith('xx') and self.hubbard:
+            self._close_hubbard()
+        elif temp.startswith('|--'):
+            self.hubbard.append(None)
+        elif self.hubbard and temp.startswith('|'):
+            tokens = temp.replace('|', ' ').split()
+            self.hubbard.append(tokens)
+
+    def _close_hubbard(self):
+        run = self.run
+        rows = [tokens for tokens in self.hubbard[1:]]
+        if run.nions is not None:
+            rows = rows[:run.nions]
+
+        items = []
+        for tokens in rows:
+            if all(float(u) == 0 for u in tokens[2:6]):
+                continue
+            item = f"{tokens[0]}:{float(tokens[4]):4.2f}"
+            if not items or items[-1] != item:
+                items.append(item)
+
+        run.hubbard = " ".join(items)
+        self.hubbard = None
+
+    # --------------------------------------------------------------------------
+    # SCF cycles, geometry optimisation and final configuration
+    # --------------------------------------------------------------------------
+
+    def _capture_final(self):
+        task = self.run.task
+        return task == 'single point energy' or (task == 'geometry optimization' and self.in_final)
+
+    def _feed_body(self, line: str):
+        if '<-- SCF' in line:
+            return
+
+        run = self.run
+        temp = line.strip()
+
+        if self.mulliken is not None:
+            self._feed_mulliken(temp)
+            return
+
+        if temp.startswith('Total time'):
+            self.finished = True
+            return
+
+        if ': finished iteration' in temp:
+            run.niter = int(temp.split()[3])
+            return
+
+        if 'Geometry optimization' in temp:
+            if 'failed' in temp:
+                self.ngeom_failed += 1
+            elif 'completed' in temp:
+                self.ngeom_completed += 1
+            return
+
+        if ': Final Configuration' in temp:
+            self.in_final = True
+            for name in (
+                'final_a', 'final_b', 'final_c', 'final_alpha', 'final_beta', 'final_gamma',
+                'final_volume', 'final_density', 'enthalpy', 'pressure', 'spinmom', 'ion_spin'
+            ):
+                setattr(run, name, None)
+            run.snap_to_symmetry = 'false'
+            return
+
+        if not self._capture_final():
+            return
+
+        if temp.startswith('a =') or temp.startswith('b =') or temp.startswith('c ='):
+            tokens = temp.split()
+            setattr(run, 'final_' + tokens[0], float(tokens[2]))
+            setattr(run, 'final_' + tokens[3], float(tokens[5]))
+        elif temp.startswith('Current cell volume ='):
+            run.final_volume = float(temp.split()[4])
+        elif temp.endswith('g/cm^3'):
+            run.final_density = float(temp.split()[1])
+        elif temp.startswith('Species') and 'Spin' in temp and 'hbar/2' in temp:
+            self.mulliken = []
+        elif 'Symmetrised Forces' in temp:
+            run.snap_to_symmetry = 'true'
+        elif 'Pressure:' in temp:
+            run.pressure = float(temp.replace('*', ':').split(':')[2].split()[0])
+        elif '=' in temp and any(key in temp for key in ENERGY_KEYS):
+            run.enthalpy = float(temp.split('=', 1)[1].split()[0])
+
+    def _feed_mulliken(self, temp: str):
+        """
+        Mulliken populations: rows between the two '==' rules after the header,
+        see mulliken_row() for the row formats. Only tables with a spin
+        column are collected, so the rows are always read as polarised.
+        """
+        if temp.startswith('=='):
+            if self.mulliken:
+                self._close_mulliken()
+            else:
+                self.mulliken.append(None)
+        elif self.mulliken and temp:
+            row = mulliken_row(temp, polarised=True)
+            if row is not None:
+                self.mulliken.append(row)
+
+    def _close_mulliken(self):
+        run = self.run
+        rows = self.mulliken[1:]
+        if run.nions is not None:
+            rows = rows[-run.nions:]
+
+        run.spinmom = sum(spin for _, _, spin in rows)
+        run.ion_spin = "".join(
+            f"{item}, " for item in sorted({f"{element}={spin:.2f}" for element, _, spin in rows})
+        )
+        self.mulliken = None
+
+
+CONV_COLUMNS = [
+    'step', 'a', 'b', 'c', 'alpha', 'beta', 'gamma', 'volume', 'density', 'spin', 'energy'
+]
+
+
+class ConvParser:
+    """
+    Line-driven parser of the geometry optimisation steps of a .castep file.
+
+    Every 'starting iteration' or 'improving iteration' block of the optimiser
+    (LBFGS, BFGS, ...) gives one row with the lattice parameters, volume,
+    density, integrated spin density and final energy of that step.
+    A row is moved to self.rows only once its block is closed, so the parser
+    can be fed a growing file piece by piece without emitting partial rows.
+    """
+
+    def __init__(self):
+        self.rows = []
+        self.row = None
+
+    def feed(self, line: str):
+        if '<-- SCF' in line:
+            return
+
+        temp = line.strip()
+
+        if ' iteration ' in temp:
+            tokens = temp.split()
+            if len(tokens) > 3 and tokens[0].endswith(':') and tokens[2] == 'iteration':
+                self.close()
+                if tokens[1] in ('starting', 'improving'):
+                    self.row = {'step': f"{int(tokens[3])}_{tokens[0]}{tokens[1]}"}
+                return
+
+        if BANNER in line or ': Final Configuration' in temp or temp.startswith('Total time'):
+            self.close()
+            return
+
+        row = self.row
+        if row is None:
+            return
+
+        if temp.startswith('a =') or temp.startswith('b =') or temp.startswith('c ='):
+            tokens = temp.split()
+            row[tokens[0]] = float(tokens[2])
+            row[tokens[3]] = float(tokens[5])
+        elif temp.startswith('Current cell volume ='):
+            row['volume'] = float(temp.split()[4])
+        elif temp.endswith('g/cm^3'):
+            row['density'] = float(temp.split()[1])
+        elif temp.startswith('Integrated Spin Density'):
+            row.setdefault('spin', float(temp.split()[4]))
+        elif temp.startswith('Final energy'):
+            row.setdefault('energy', float(temp.split('=', 1)[1].split()[0]))
+
+    def close(self):
+        """
+        Close the current block, if any, and append it to self.rows
+        """
+        if self.row is not None:
+            self.rows.append({key: self.row.get(key, math.nan) for key in CONV_COLUMNS})
+            self.row = None
+
+
+def parse(filename: str) -> list[CastepRun]:
+    """
+    Parse a (possibly concatenated) .castep file in a single pass
+
+    Returns one CastepRun per CASTEP banner found in the file.
+    """
+    return CastepParser.from_file(filename).runs
+
+
+#===============================================================================
+# Byte-offset index of concatenated runs
+#===============================================================================
+
+def index_runs(filename: str, sidecar: bool = False) -> list[tuple[int, int]]:
+    """
+    Byte ranges [start, end) of every CASTEP run in a concatenated .castep file
+
+    A run starts at the line holding the CASTEP banner (as csplit would split
+    it); anything before the first banner is not a run. The file is scanned
+    once through a memory map, no copies are written.
+
+    With sidecar=True the ranges are kept in {filename}.idx together with the
+    size and mtime of the file. An unchanged file is not scanned at all and a
+    file that has grown (restarts are appended) is only rescanned from the
+    start of its last run.
+    """
+    stat = os.stat(filename)
+    index_file = f"{filename}.idx"
+
+    starts = []
+    offset = 0
+    if sidecar:
+        cached = _read_index(index_file)
+        if cached is not None:
+            if cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+                return [tuple(r) for r in cached['runs']]
+            if 0 < cached['size'] < stat.st_size and cached['runs']:
+                starts = [start for start, _ in cached['runs']]
+                offset = starts.pop()
+
+    if stat.st_size > 0:
+        with open(filename, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = mm.find(BANNER_BYTES, offset)
+            while pos != -1:
+                starts.append(mm.rfind(b'\n', 0, pos) + 1)
+                pos = mm.find(BANNER_BYTES, pos + len(BANNER_BYTES))
+
+    runs = list(zip(starts, starts[1:] + [stat.st_size]))
+
+    if sidecar:
+        with open(index_file, 'w') as f:
+            json.dump({
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'runs': runs
+            }, f)
+
+    return runs
+
+
+def _read_index(index_file: str) -> dict | None:
+    try:
+        with open(index_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def iter_lines(filename: str, start: int = 0, end: int | None = None):
+    """
+    Yield the lines of filename between the byte offsets start and end,
+    read through a memory map so that nothing before start is touched
+    """
+    if end is None:
+        end = os.path.getsize(filename)
+    if end <= start:
+        return
+
+    with open(filename, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        mm.seek(start)
+        while mm.tell() < end:
+            yield mm.readline().decode(errors='replace')
+
+
+def parse_run(filename: str, n: int = -1, runs: list[tuple[int, int]] | None = None,
+    sidecar: bool = False
+) -> CastepRun:
+    """
+    Parse only the n-th run (default: the last one) of a concatenated .castep file
+    """
+    if runs is None:
+        runs = index_runs(filename, sidecar=sidecar)
+    start, end = runs[n]
+
+    parser = CastepParser()
+    for line in iter_lines(filename, start, end):
+        parser.feed(line)
+    parser.close()
+    return parser.runs[0]
+
+
+#===============================================================================
+# TSV output (same columns as bin/cas)
+#===============================================================================
+
+TSV_INPUT_PARAM = [
+    ('task', 'task'),
+    ('xc_functional', 'xc_functional'),
+    ('sedc_scheme', 'sedc_scheme'),
+    ('cut_off_energy', 'cut_off_energy'),
+    ('grid_scale', 'grid_scale'),
+    ('fine_grid_scale', 'fine_grid_scale'),
+    ('finite_basis_corr', 'finite_basis_corr'),
+    ('nelectrons', 'nelectrons'),
+    ('spin', 'spin'),
+    ('spin_polarized', 'spin_polarized'),
+    ('nbands', 'nbands'),
+    ('metals_method', 'metals_method'),
+    ('elec_energy_tol', 'elec_energy_tol'),
+    ('smearing_width', 'smearing_width'),
+    ('dipole_correction', 'dipole_correction'),
+    ('dipole_dir', 'dipole_dir'),
+    ('fixed_npw', 'fixed_npw'),
+    ('geom_energy_tol', 'geom_energy_tol'),
+    ('geom_force_tol', 'geom_force_tol'),
+    ('geom_disp_tol', 'geom_disp_tol'),
+    ('geom_stress_tol', 'geom_stress_tol'),
+]
+
+TSV_INPUT_CELL = [
+    ('a(Å)', 'a'),
+    ('b(Å)', 'b'),
+    ('c(Å)', 'c'),
+    ('α(°)', 'alpha'),
+    ('β(°)', 'beta'),
+    ('γ(°)', 'gamma'),
+    ('volume(Å**3)', 'volume'),
+    ('density(g/cc)', 'density'),
+    ('nions', 'nions'),
+    ('hubbard', 'hubbard'),
+    ('kpoints_mp_spacing', 'kpoints_mp_spacing'),
+    ('kpoints_mp_grid', 'kpoints_mp_grid'),
+    ('symmops', 'symmops'),
+    ('spacegroup', 'spacegroup'),
+    ('cell_constraints', 'cell_constraints'),
+]
+
+TSV_OUTPUT = [
+    ('status', 'status'),
+    ('niter', 'niter'),
+    ('a(Å)', 'final_a'),
+    ('b(Å)', 'final_b'),
+    ('c(Å)', 'final_c'),
+    ('α(°)', 'final_alpha'),
+    ('β(°)', 'final_beta'),
+    ('γ(°)', 'final_gamma'),
+    ('volume(Å**3)', 'final_volume'),
+    ('density(g/cc)', 'final_density'),
+    ('enthalpy(eV)', 'enthalpy'),
+    ('snap_to_symmetry', 'snap_to_symmetry'),
+    ('pressure(GPa)', 'pressure'),
+    ('spin(hbar/2/cell)', 'spinmom'),
+    ('spin(hbar/2/ion)', 'ion_spin'),
+]
+
+
+def _tsv_value(value) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return 'NaN'
+    if value == '':
+        return 'NaN'
+    return str(value)
+
+
+def to_tsv_rows(runs: list[CastepRun], columns: list[tuple[str, str]]) -> list[str]:
+    lines = ["\t".join(header for header, _ in columns)]
+    for run in runs:
+        lines.append("\t".join(_tsv_value(getattr(run, attr)) for _, attr in columns))
+    return lines
+
+
+def write_tsv(runs: list[CastepRun], prefix: str = 'data'):
+    """
+    Write {prefix}-input-param.tsv, {prefix}-input-cell.tsv, {prefix}-output.tsv
+    and the pasted {prefix}.tsv, with one row per run
+    """
+    tables = {
+        f"{prefix}-input-param.tsv": to_tsv_rows(runs, TSV_INPUT_PARAM),
+        f"{prefix}-input-cell.tsv": to_tsv_rows(runs, TSV_INPUT_CELL),
+        f"{prefix}-output.tsv": to_tsv_rows(runs, TSV_OUTPUT),
+    }
+    for filename, lines in tables.items():
+        with open(filename, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+
+    with open(f"{prefix}.tsv", 'w') as f:
+        f.write("\n".join("\t".join(row) for row in zip(*tables.values())) + "\n")
+
+
+def read_kpoints_mp_spacing(filename: str) -> float | None:
+    """
+    KPOINTS_MP_SPACING is not echoed in the .castep file, so take it from the .cell
+    """
+    try:
+        with open(filename, 'r') as f:
+            for line in f:
+                tokens = line.replace(':', ' ').split()
+                if tokens and tokens[0].lower() == 'kpoints_mp_spacing':
+                    return float(tokens[1])
+    except (OSError, IndexError, ValueError):
+        pass
+    return None
@@ -1,15 +1,224 @@
 #!/usr/bin/env python
 
+import os
+import re
+import numpy as np
+
+try:
+    from .files import write_atomic, load_many
+except ImportError:
+    from files import write_atomic, load_many
+
+
+BOHR = 0.529177210903  # A
+
+SPIN_TAG = re.compile(r'\bspin\s*[=:]?\s*([-+.\deE]+)', re.IGNORECASE)
+
+
+class Lattice():
+    """
+    LATTICE_CART or LATTICE_ABC block as a (3, 3) array of lattice vectors
+    (rows), written back in the form it was read: as the lines read, as
+    long as the vectors are those of the lines
+    """
+
+    def __init__(self, vectors, kind: str = 'cart', unit: str | None = None):
+        self.vectors = np.asarray(vectors, dtype=float).reshape(3, 3)
+        self.kind = kind
+        self.unit = unit
+        self._lines = None
+        self._read = None
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Lattice) and self.kind == other.kind and self.unit == other.unit
+            and np.array_equal(self.vectors, other.vectors)
+        )
+
+    def copy(self):
+        lattice = Lattice(self.vectors.copy(), kind=self.kind, unit=self.unit)
+        lattice._lines, lattice._read = self._lines, self._read
+        return lattice
+
+    @ classmethod
+    def from_lines(cls, keyword, lines):
+        unit = None
+        if lines and len(lines[0].split()) == 1:
+            unit, lines = lines[0], lines[1:]
+        values = np.array([line.split()[:3] for line in lines], dtype=float)
+        if keyword == 'lattice_abc':
+            lattice = cls(abc_to_cart(values[0], values[1]), kind='abc', unit=unit)
+        else:
+            lattice = cls(values, kind='cart', unit=unit)
+        # the vectors may be changed in place, so they are compared on writing
+        lattice._lines, lattice._read = lines, lattice.vectors.copy()
+        return lattice
+
+    def abc(self):
+        """
+        Lattice lengths and angles (degrees)
+        """
+        a, b, c = self.vectors
+        lengths = np.linalg.norm(self.vectors, axis=1)
+        cosines = np.array([b @ c, a @ c, a @ b]) / lengths[[1, 0, 0]] / lengths[[2, 2, 1]]
+        return lengths, np.degrees(np.arccos(np.clip(cosines, -1, 1)))
+
+    def lines(self):
+        lines = [self.unit] if self.unit else []
+        if self._lines is not None and np.array_equal(self.vectors, self._read):
+            return lines + self._lines
+        if self.kind == 'abc':
+            rows = self.abc()
+        else:
+            rows = self.vectors
+        return lines + [" ".join(f"{x:.10f}" for x in row) for row in rows]
+
+
+def abc_to_cart(lengths, angles):
+    """
+    Lattice vectors with a along x and b in the xy plane
+    """
+    a, b, c = lengths
+    alpha, beta, gamma = np.radians(angles)
+    cx = c * np.cos(beta)
+    cy = c * (np.cos(alpha) - np.cos(beta) * np.cos(gamma)) / np.sin(gamma)
+    return np.array([
+        [a, 0.0, 0.0],
+        [b * np.cos(gamma), b * np.sin(gamma), 0.0],
+        [cx, cy, np.sqrt(c**2 - cx**2 - cy**2)]
+    ])
+
+
+class Positions():
+    """
+    POSITIONS_FRAC or POSITIONS_ABS block as NumPy arrays
+
+        species: (N,) species labels as written (e.g. 'Ni' or 'Ni:1')
+        coords:  (N, 3) fractional or cartesian coordinates
+        spins:   (N,) initial spins, NaN where no SPIN= is given
+        tags:    (N,) any other per-atom text, kept verbatim
+    """
+
+    def __init__(self, species, coords, spins=None, tags=None, unit: str | None = None):
+        self.species = np.asarray(species, dtype=str)
+        self.coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+        n = len(self.species)
+        self.spins = np.full(n, np.nan) if spins is None else np.asarray(spins, dtype=float)
+        self.tags = np.full(n, '', dtype=object) if tags is None else np.asarray(tags, dtype=object)
+        self.unit = unit
+
+    def __len__(self):
+        if '_lines' in self.__dict__:
+            return len(self._lines)
+        return len(self.species)
+
+    def __getattr__(self, name):
+        # arrays of positions read from a file are only made on first use
+        if name in ('species', 'coords', 'spins', 'tags') and '_lines' in self.__dict__:
+            self._split(self.__dict__.pop('_lines'))
+            return getattr(self, name)
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        # an assignment to a block not split yet would be lost on writing
+        if name in ('species', 'coords', 'spins', 'tags') and '_lines' in self.__dict__:
+            self._split(self.__dict__.pop('_lines'))
+        super().__setattr__(name, value)
+
+    def __eq__(self, other):
+        if not isinstance(other, Positions) or self.unit != other.unit:
+            return False
+        if '_lines' in self.__dict__ and '_lines' in other.__dict__:
+            return self._lines == other._lines
+        return (
+            np.array_equal(self.species, other.species)
+            and np.array_equal(self.coords, other.coords)
+            and np.array_equal(self.spins, other.spins, equal_nan=True)
+            and list(self.tags) == list(other.tags)
+        )
+
+    def copy(self):
+        if '_lines' in self.__dict__:
+            positions = Positions.__new__(Positions)
+            positions.unit = self.unit
+            positions._lines = self._lines
+            return positions
+        return Positions(
+            self.species.copy(), self.coords.copy(), self.spins.copy(), self.tags.copy(), unit=self.unit
+        )
+
+    @ classmethod
+    def from_lines(cls, lines):
+        """
+        Positions of block lines, which are split into arrays only when
+        they are used and are otherwise written back as they were read
+        """
+        positions = cls.__new__(cls)
+        positions.unit = None
+        if lines and len(lines[0].split()) == 1:
+            positions.unit, lines = lines[0], lines[1:]
+        positions._lines = lines
+        return positions
+
+    def _split(self, lines):
+        rows = [line.split(maxsplit=4) for line in lines]
+        self.species = np.array([row[0] for row in rows], dtype=str)
+        self.coords = np.array([row[1:4] for row in rows], dtype=float).reshape(-1, 3)
+        self.spins = np.full(len(rows), np.nan)
+        self.tags = np.full(len(rows), '', dtype=object)
+        for i, row in enumerate(rows):
+            if len(row) > 4:
+                tag = row[4]
+                match = SPIN_TAG.search(tag)
+                if match:
+                    self.spins[i] = float(match.group(1))
+                    tag = (tag[:match.start()] + tag[match.end():]).strip()
+                self.tags[i] = tag
+
+    def elements(self):
+        """
+        Species without labels ('Ni:1' -> 'Ni')
+        """
+        return np.char.partition(self.species, ':')[:, 0]
+
+    def lines(self):
+        lines = [self.unit] if self.unit else []
+        if '_lines' in self.__dict__:
+            return lines + self._lines
+        for species, (x, y, z), spin, tag in zip(self.species, self.coords, self.spins, self.tags):
+            line = f"{species} {x:.16f} {y:.16f} {z:.16f}"
+            if tag:
+                line += f" {tag}"
+            if not np.isnan(spin):
+                line += f" SPIN={spin}"
+            lines.append(line)
+        return lines
+
+
+LATTICE_BLOCKS = ['lattice_cart', 'lattice_abc']
+POSITIONS_BLOCKS = ['positions_frac', 'positions_abs']
+
+# one match per block or per 'KEYWORD [:=] value' line; comments never match
+CELL_TOKEN = re.compile(
+    r'^[ \t]*%block[ \t]+(\w+)[^\n]*\n((?:(?![ \t]*%endblock)[^\n]*\n)*)[ \t]*%endblock\b[^\n]*'
+    r'|^[ \t]*([^#%:=\s][^:=\s]*)(?:[ \t]*[:=][ \t]*|[ \t]+|$)([^\n]*?)[ \t]*$',
+    re.IGNORECASE | re.MULTILINE
+)
+
 
 class Cell():
 
     def __init__(self, seed, cell):
         self.seed = seed
         self.cell = cell
+        self._saved = None
+        self._saved_file = None
 
     def __str__(self):
         lines = []
         for k, v in self.cell.items():
+            if isinstance(v, (Lattice, Positions)):
+                v = v.lines()
             if isinstance(v, list):
                 lines.append("\n".join(
                     [f"%BLOCK {k.upper()}", *v, f"%ENDBLOCK {k.upper()}"]
@@ -26,64 +235,190 @@ class Cell():
     @ classmethod
     def from_file(cls, filename):
         seed = filename.replace('.cell', '')
-        cell = {}
         with open(filename, 'r') as f:
-            lines = iter(f.readlines())
-
-            # covert to lowercase except elements
-            for line in lines:
-                temp = line.strip()
-
-                # skip comments
-                if not temp or temp.startswith('#'):
-                    continue
-
-                if temp.lower().startswith('%block'):
-                    keyword = line.lower().split()[1]
-                    cell[keyword] = []
-
-                    for line in lines:
-                        temp = line.strip()
-                        if temp.lower().startswith('%endblock'):
-                            break
-                        else:
-                            cell[keyword].append(temp)
+            cell = cls.from_text(seed, f.read())
+        cell._mark_saved(filename)
+        return cell
+
+    @ classmethod
+    def from_text(cls, seed, text):
+        """
+        Blocks keep their lines as written (lattice and positions as arrays),
+        keywords and their values are converted to lowercase
+        """
+        cell = {}
+        for match in CELL_TOKEN.finditer(text):
+            keyword, body, key, value = match.groups()
+            if keyword is not None:
+                keyword = keyword.lower()
+                lines = [line for line in map(str.strip, body.splitlines()) if line]
+                if keyword in LATTICE_BLOCKS:
+                    cell[keyword] = Lattice.from_lines(keyword, lines)
+                elif keyword in POSITIONS_BLOCKS:
+                    cell[keyword] = Positions.from_lines(lines)
                 else:
-                    temp = temp.lower()
-                    tokens = temp.split(':', maxsplit=1)
-                    print(tokens)
-                    if len(tokens) > 1:
-                        key = tokens[0].strip()
-                        value = tokens[1].strip()
-                    else:
-                        tokens = temp.split()
-                        key = tokens[0].strip()
-                        value = tokens[1:].strip() if len(tokens) > 1 else ""
-                    cell[key] = value
+                    cell[keyword] = lines
+            else:
+                cell[key.lower()] = value.lower()
 
         return cls(seed=seed, cell=cell)
 
+    @ classmethod
+    def load_many(cls, filenames, processes: int | None = 1, chunksize: int = 64):
+        """
+        Cell.from_file() of every file, in order; processes other than 1
+        spreads the files over a process pool (None: all cores)
+        """
+        return load_many(cls.from_file, filenames, processes, chunksize)
+
     @ classmethod
     def from_seed(cls, seed):
         return cls.from_file(f"{seed}.cell")
 
+    def snapshot(self, link: bool = False) -> str:
+        """
+        Save {seed}.cell as it is on disk into the project snapshot store
+        (see snapshot.py) and return its hash
+        """
+        try:
+            from .snapshot import snapshot
+        except ImportError:
+            from snapshot import snapshot
+        return snapshot([f"{self.seed}.cell"], link=link)[0]
+
     def copy_to_md5(self):
-        import hashlib
-        with open(f"{self.seed}.cell", 'rb') as fin:
-            bytes = fin.read()
-            hash = hashlib.md5(bytes).hexdigest()
-            with open(f"{self.seed}.cell.{hash[:8]}", 'wb') as fout:
-                fout.write(bytes)
+        """
+        Former {seed}.cell.<md5> copies, now a snapshot()
+        """
+        return self.snapshot()
 
 
-    def to_file(self, filename: str | None = None):
+    def to_file(self, filename: str | None = None, force: bool = False) -> bool:
+        """
+        Write through a temporary file and an atomic rename. Nothing is
+        written if the cell is unchanged since it was read from (or written
+        to) the same file, unless force. Returns whether the file was written.
+        """
         if filename == None:
             filename = f"{self.seed}.cell"
-        with open(filename, 'w') as f:
-            f.write(str(self))
+        if not force and self._saved_file == os.path.abspath(filename) and not self.changed():
+            return False
+        write_atomic(filename, str(self))
+        self._mark_saved(filename)
+        return True
+
+    def _mark_saved(self, filename):
+        self._saved_file = os.path.abspath(filename)
+        self._saved = {
+            k: v.copy() if isinstance(v, (Lattice, Positions, list)) else v
+            for k, v in self.cell.items()
+        }
+
+    def changed(self) -> list[str]:
+        """
+        Keywords and blocks added, removed or modified since the cell was
+        read or last written (all of them for a new cell)
+        """
+        if self._saved is None:
+            return list(self.cell)
+        changed = [k for k in self._saved if k not in self.cell]
+        for k, v in self.cell.items():
+            if k not in self._saved:
+                changed.append(k)
+            elif isinstance(v, (Lattice, Positions)):
+                if v != self._saved[k]:
+                    changed.append(k)
+            elif str(v) != str(self._saved[k]):
+                changed.append(k)
+        return changed
 
     def as_dict(self):
-        return self.cell
+        return {
+            k: v.lines() if isinstance(v, (Lattice, Positions)) else v
+            for k, v in self.cell.items()
+        }
+
+    def _block(self, keys):
+        for key in keys:
+            if key in self.cell:
+                return self.cell[key]
+        return None
+
+    @ property
+    def lattice(self) -> np.ndarray | None:
+        """
+        Lattice vectors (rows) as a (3, 3) array
+        """
+        block = self._block(LATTICE_BLOCKS)
+        return None if block is None else block.vectors
+
+    @ property
+    def positions(self) -> np.ndarray | None:
+        """
+        (N, 3) coordinates, fractional or cartesian as in the cell file
+        """
+        block = self._block(POSITIONS_BLOCKS)
+        return None if block is None else block.coords
+
+    @ property
+    def species(self) -> np.ndarray | None:
+        block = self._block(POSITIONS_BLOCKS)
+        return None if block is None else block.species
+
+    @ property
+    def spins(self) -> np.ndarray | None:
+        block = self._block(POSITIONS_BLOCKS)
+        return None if block is None else block.spins
+
+    def set_structure(self, other):
+        """
+        Take the lattice and positions of another cell (e.g. {seed}-out.cell
+        after a relaxation) and keep everything else; the blocks go first,
+        without an 'ang' unit line (the default)
+        """
+        blocks = {}
+        for key in LATTICE_BLOCKS + POSITIONS_BLOCKS:
+            if key in other.cell:
+                block = other.cell[key].copy()
+                if block.unit is not None and block.unit.lower() == 'ang':
+                    block.unit = None
+                blocks[key] = block
+        rest = {
+            k: v for k, v in self.cell.items()
+            if k not in LATTICE_BLOCKS + POSITIONS_BLOCKS
+        }
+        self.cell.clear()
+        self.cell.update(blocks)
+        self.cell.update(rest)
+
+    def displace(self, displacement, cartesian: bool = True):
+        """
+        Move the atoms by a (3,) or (N, 3) displacement, in Angstrom
+        (cartesian) or in fractional coordinates
+        """
+        displacement = np.asarray(displacement, dtype=float)
+        if 'positions_frac' in self.cell:
+            if cartesian:
+                displacement = displacement @ np.linalg.inv(self.lattice)
+            self.cell['positions_frac'].coords += displacement
+        else:
+            if not cartesian:
+                displacement = displacement @ self.lattice
+            self.cell['positions_abs'].coords += displacement
+
+    def strain(self, strain):
+        """
+        Deform the cell by (1 + strain): a scalar (isotropic), a (3,)
+        diagonal or a (3, 3) strain tensor. Fractional positions are kept,
+        cartesian positions move with the cell.
+        """
+        strain = np.asarray(strain, dtype=float)
+        if strain.ndim < 2:
+            strain = np.eye(3) * strain
+        deformation = (np.eye(3) + strain).T
+        self._block(LATTICE_BLOCKS).vectors = self.lattice @ deformation
+        if 'positions_abs' in self.cell:
+            self.cell['positions_abs'].coords = self.cell['positions_abs'].coords @ deformation
 
 
     def set_ionic_constraints(self, option: str = 'off'):
@@ -136,6 +471,21 @@ class Cell():
             self.cell.pop('kpoints_list', None)
             self.cell.update({'kpoints_mp_spacing': spacing})
 
+    def kpoints_mp_grid(self, spacing: float) -> tuple[int, int, int]:
+        """
+        Monkhorst-Pack grid CASTEP makes of a KPOINTS_MP_SPACING (in 2pi/A):
+        along each reciprocal lattice vector b, ceil(|b| / (2pi spacing)),
+        at least one
+        """
+        lattice = self.lattice
+        unit = self._block(LATTICE_BLOCKS).unit
+        if unit is not None and unit.lower() == 'bohr':
+            lattice = lattice * BOHR
+        # |b| / 2pi: the rows of the inverse transposed
+        lengths = np.linalg.norm(np.linalg.inv(lattice).T, axis=1)
+        # a spacing that divides |b| exactly gives that number, not one more
+        return tuple(int(max(1, np.ceil(x / spacing - 1e-8))) for x in lengths)
+
     def set_pseudopot(self, pot: str = "C19"):
         if pot == 'off':
             self.cell.pop('species_pot')
@@ -181,24 +531,22 @@ class Cell():
             self.cell.pop('species_lcao_states', None)
 
     def set_spin(self, option='mp'):
+        """
+        'mp': 5 for d-block elements and 0.6 otherwise (Materials Project),
+        'off': remove all spins, or a spin (or array of spins per atom)
+        """
         d_block_3d = ['Sc','Ti','V','Cr','Mn','Fe','Co','Ni','Cu','Zn']
         d_block_4d = ['Y','Zr','Nb','Mo','Tc','Ru','Rh','Pd','Ag','Cd']
         d_block_5d = ['La','Hf','Ta','W','Re','Os','Ir','Pt','Au','Hg']
         d_block = d_block_3d + d_block_4d + d_block_5d
 
-        for i, atom in enumerate(self.cell['positions_frac']):
-            tokens = atom.split()
-            element = tokens[0]
+        positions = self._block(POSITIONS_BLOCKS)
 
-            if option == 'mp':
-                if element in d_block:
-                    spin = 5.0
-                else:
-                    spin = 0.6
-
-            if not 'SPIN' in atom:
-                self.cell['positions_frac'][i] = atom + f' SPIN={spin}'
-            else:
-                atom_wospin = atom.split(' SPIN')[0]
-                self.cell['positions_frac'][i] = atom_wospin + f' SPIN={spin}'
+        if isinstance(option, str) and option == 'mp':
+            spins = np.where(np.isin(positions.elements(), d_block), 5.0, 0.6)
+        elif isinstance(option, str) and option == 'off':
+            spins = np.nan
+        else:
+            spins = option
 
+        positions.spins = np.broadcast_to(np.asarray(spins, dtype=float), (len(positions),)).copy()
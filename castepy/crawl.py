@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import csv
+import typing
+from dataclasses import fields
+from multiprocessing import Pool
+
+from .castep import (
+    CastepRun, parse, read_kpoints_mp_spacing,
+    TSV_INPUT_PARAM, TSV_INPUT_CELL, TSV_OUTPUT
+)
+from .cache import ParseCache
+
+
+# same columns as bin/cas (data.tsv), named after the CastepRun fields
+# since the input and final unit cell share their bin/cas headers
+CRAWL_COLUMNS = ['path', 'run', 'error'] + [
+    attr for _, attr in TSV_INPUT_PARAM + TSV_INPUT_CELL + TSV_OUTPUT
+]
+
+
+def find_castep(root: str):
+    """
+    Yield the path of every .castep file under root (hidden directories are skipped)
+    """
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith('.castep'):
+                    yield entry.path
+
+
+def summarise(path: str, records: list[dict] | None = None) -> list[dict]:
+    """
+    One row per run of a .castep file; a file that cannot be parsed gives
+    a single row with the error message instead of stopping the crawl.
+    Already parsed records (e.g. from the parse cache) are used as given.
+    """
+    try:
+        if records is None:
+            records = [run.as_dict() for run in parse(path)]
+        kpoints_mp_spacing = read_kpoints_mp_spacing(path[:-len('.castep')] + '.cell')
+    except Exception as err:
+        return [{'path': path, 'run': None, 'error': f"{type(err).__name__}: {err}"}]
+
+    if not records:
+        return [{'path': path, 'run': None, 'error': 'no CASTEP run found'}]
+
+    rows = []
+    for n, record in enumerate(records):
+        row = {'path': path, 'run': n, 'error': None}
+        row.update(record)
+        row['kpoints_mp_spacing'] = kpoints_mp_spacing
+        rows.append(row)
+    return rows
+
+
+def _summarise_new(path: str) -> tuple[tuple[int, int, int] | None, list[dict]]:
+    """
+    summarise() in a worker, together with the identity of the file before parsing
+    """
+    try:
+        identity = ParseCache._identity(path)
+    except OSError:
+        identity = None
+    return identity, summarise(path)
+
+
+class CsvSink:
+
+    def __init__(self, filename: str):
+        self.file = open(filename, 'w', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=CRAWL_COLUMNS, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, rows: list[dict]):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    """
+    Buffer rows and write them as row groups of at most batch_size rows,
+    so memory stays bounded however many files are crawled
+    """
+
+    def __init__(self, filename: str, batch_size: int = 10000):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema([(name, _arrow_type(name)) for name in CRAWL_COLUMNS])
+        self.writer = pq.ParquetWriter(filename, self.schema)
+        self.batch_size = batch_size
+        self.rows = []
+
+    def write(self, rows: list[dict]):
+        self.rows.extend(rows)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            table = self.pa.Table.from_pylist(self.rows, schema=self.schema)
+            self.writer.write_table(table)
+            self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def _arrow_type(name: str):
+    import pyarrow as pa
+
+    if name == 'run':
+        return pa.int64()
+    types = {f.name: typing.get_args(f.type) or (f.type,) for f in fields(CastepRun)}
+    if float in types.get(name, ()):
+        return pa.float64()
+    if int in types.get(name, ()):
+        return pa.int64()
+    return pa.string()
+
+
+def crawl(root: str, output: str, processes: int | None = None, chunksize: int = 16,
+    progress: bool = True, cache: ParseCache | None = None
+) -> tuple[int, int]:
+    """
+    Summarise every .castep file under root into a single CSV or Parquet
+    table (by the extension of output), parsing the files across a process
+    pool. Rows are written as soon as a file is done.
+
+    With a ParseCache, files that have not changed since they were last
+    parsed are taken from the cache and only new or grown files are parsed.
+
+    Returns the number of files and the number of files that failed.
+    """
+    paths = list(find_castep(root))
+    nfiles = len(paths)
+    nerrors = 0
+    ndone = 0
+
+    if output.endswith('.parquet') or output.endswith('.pq'):
+        sink = ParquetSink(output)
+    else:
+        sink = CsvSink(output)
+
+    def write(rows):
+        nonlocal nerrors, ndone
+        sink.write(rows)
+        ndone += 1
+        if rows and rows[0]['error'] is not None:
+            nerrors += 1
+            print(f"\n{rows[0]['path']}: {rows[0]['error']}", file=sys.stderr)
+        if progress:
+            print(f"{ndone}/{nfiles}", end="\r", file=sys.stderr, flush=True)
+
+    try:
+        if cache is not None:
+            new = []
+            for path in paths:
+                records = cache.get(path, 'castep')
+                if records is None:
+                    new.append(path)
+                else:
+                    write(summarise(path, records))
+            paths = new
+
+        with Pool(processes=processes) as pool:
+            for identity, rows in pool.imap_unordered(_summarise_new, paths, chunksize=chunksize):
+                write(rows)
+                if cache is not None and identity is not None and rows[0]['error'] is None:
+                    fields_run = [f.name for f in fields(CastepRun)]
+                    records = [{name: row[name] for name in fields_run} for row in rows]
+                    cache.put(rows[0]['path'], 'castep', records, identity=identity)
+    finally:
+        sink.close()
+
+    if progress:
+        print(file=sys.stderr)
+
+    return nfiles, nerrors
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+import os
+import re
+import shutil
+
+
+def write_atomic(filename, text):
+    """
+    Write text to a hidden temporary file next to filename and rename it
+    over filename, so that the file is never seen half-written; the mode
+    of an existing file is kept
+    """
+    directory, basename = os.path.split(filename)
+    temp = os.path.join(directory, f".{basename}.{os.getpid()}.tmp")
+    try:
+        with open(temp, 'w') as f:
+            f.write(text)
+        if os.path.exists(filename):
+            shutil.copymode(filename, temp)
+        os.replace(temp, filename)
+    except BaseException:
+        if os.path.exists(temp):
+            os.unlink(temp)
+        raise
+
+
+def load_many(load, filenames, processes: int | None = 1, chunksize: int = 64):
+    """
+    load(filename) of every file, in order; processes other than 1 spreads
+    the files over a process pool (None: all cores)
+    """
+    if processes == 1:
+        return [load(filename) for filename in filenames]
+
+    from multiprocessing import Pool
+    with Pool(processes=processes) as pool:
+        return pool.map(load, filenames, chunksize=chunksize)
+
+
+def _keyword_line(keyword: str, commented: bool = False):
+    # 'keyword : value', 'keyword = value' or 'keyword value', any case
+    prefix = r'[ \t]*#[ \t]*' if commented else r'[ \t]*'
+    return re.compile(rf'^{prefix}({re.escape(keyword)})(?:[ \t]*[:=]|[ \t]|$)', re.IGNORECASE)
+
+
+def _edit_lines(filename, edit) -> bool:
+    """
+    Pass every line outside %block/%endblock to edit(line) (a line or None
+    to drop it) and write the file if anything changed
+    """
+    with open(filename, 'r') as f:
+        lines = f.read().splitlines(keepends=True)
+
+    new, in_block = [], False
+    for line in lines:
+        temp = line.strip().lower()
+        if temp.startswith('%block'):
+            in_block = True
+        elif temp.startswith('%endblock'):
+            in_block = False
+        elif not in_block:
+            line = edit(line)
+        if line is not None:
+            new.append(line)
+
+    if new == lines:
+        return False
+    write_atomic(filename, "".join(new))
+    return True
+
+
+def set_keyword(filename, keyword: str, value) -> bool:
+    """
+    Set a keyword of a .param or .cell file by editing its line in place
+    (as sed did): the first line of the keyword becomes 'keyword : value',
+    further ones are dropped, and the line is appended if there is none.
+    Everything else in the file is left as it is. Returns whether the file
+    changed.
+    """
+    pattern = _keyword_line(keyword)
+    found = False
+
+    def edit(line):
+        nonlocal found
+        match = pattern.match(line)
+        if match is None:
+            return line
+        if found:
+            return None
+        found = True
+        return f"{match.group(1)} : {value}\n"
+
+    changed = _edit_lines(filename, edit)
+    if not found:
+        with open(filename, 'r') as f:
+            text = f.read()
+        if text and not text.endswith('\n'):
+            text += '\n'
+        write_atomic(filename, text + f"{keyword} : {value}\n")
+        changed = True
+    return changed
+
+
+def comment_keyword(filename, keyword: str, comment: bool = True) -> bool:
+    """
+    Comment out the lines of a keyword ('task' -> '#task', as
+    sed 's/^task/#task/'), or uncomment them again; returns whether the
+    file changed
+    """
+    pattern = _keyword_line(keyword, commented=not comment)
+
+    def edit(line):
+        if pattern.match(line) is None:
+            return line
+        return '#' + line if comment else line.replace('#', '', 1)
+
+    return _edit_lines(filename, edit)
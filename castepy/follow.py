@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+import os
+import math
+import pickle
+
+from .castep import ConvParser, CONV_COLUMNS
+
+
+CONV_FORMAT = {
+    'step': '{}',
+    'a': '{:.2f}',
+    'b': '{:.2f}',
+    'c': '{:.2f}',
+    'alpha': '{:.2f}',
+    'beta': '{:.2f}',
+    'gamma': '{:.2f}',
+    'volume': '{:.2f}',
+    'density': '{:.2f}',
+    'spin': '{:.2f}',
+    'energy': '{:.6f}',
+}
+
+
+class CastepFollower:
+    """
+    Tail-follow a running .castep file.
+
+    The byte offset of the last complete line and the state of the ConvParser
+    are kept in {filename}.follow, so every poll only reads the bytes that
+    CASTEP appended since the previous one, also across separate invocations.
+    The state is reset when the file is replaced or truncated.
+    """
+
+    def __init__(self, filename: str, state_file: str | None = None):
+        self.filename = filename
+        self.state_file = state_file or f"{filename}.follow"
+        self.inode = None
+        self.offset = 0
+        self.parser = ConvParser()
+        self.rewound = False
+
+    @ classmethod
+    def load(cls, filename: str, state_file: str | None = None):
+        follower = cls(filename, state_file=state_file)
+        try:
+            with open(follower.state_file, 'rb') as f:
+                state = pickle.load(f)
+            follower.inode = state['inode']
+            follower.offset = state['offset']
+            follower.parser = state['parser']
+        except (OSError, EOFError, KeyError, pickle.UnpicklingError, AttributeError):
+            pass
+        return follower
+
+    def save(self):
+        temp = f"{self.state_file}.temp"
+        with open(temp, 'wb') as f:
+            pickle.dump({
+                'inode': self.inode,
+                'offset': self.offset,
+                'parser': self.parser
+            }, f)
+        os.replace(temp, self.state_file)
+
+    def reset(self):
+        self.inode = None
+        self.offset = 0
+        self.parser = ConvParser()
+        self.rewound = True
+
+    def poll(self) -> list[dict]:
+        """
+        Parse the lines appended since the last poll and return the new rows
+
+        self.rewound is set when parsing had to start again from the top of
+        the file, i.e. the rows returned replace rather than extend the table.
+        """
+        self.rewound = self.offset == 0
+
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            return []
+
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            self.reset()
+            self.inode = stat.st_ino
+
+        if stat.st_size == self.offset:
+            return []
+
+        with open(self.filename, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read(stat.st_size - self.offset)
+
+        # leave an incomplete last line for the next poll
+        end = chunk.rfind(b'\n') + 1
+        if end == 0:
+            return []
+        self.offset += end
+
+        nrows = len(self.parser.rows)
+        for line in chunk[:end].decode(errors='replace').splitlines(keepends=True):
+            self.parser.feed(line)
+
+        return self.parser.rows[nrows:]
+
+
+def format_row(row: dict) -> str:
+    return "\t".join(
+        'NaN' if isinstance(row[key], float) and math.isnan(row[key])
+        else CONV_FORMAT[key].format(row[key])
+        for key in CONV_COLUMNS
+    )
+
+
+def append_table(rows: list[dict], filename: str, new: bool = False):
+    """
+    Append rows to a TSV convergence table, writing the header for a new table
+    """
+    new = new or not os.path.exists(filename) or os.path.getsize(filename) == 0
+    with open(filename, 'w' if new else 'a') as f:
+        if new:
+            f.write("\t".join(CONV_COLUMNS) + "\n")
+        for row in rows:
+            f.write(format_row(row) + "\n")
+
+
+def poll(follower: CastepFollower, table: str | None = None) -> list[dict]:
+    """
+    One poll of a .castep file: parse new output, append new rows to the table
+    (if given) and persist the offset and parser state
+    """
+    rows = follower.poll()
+    if table is not None and (rows or follower.rewound or not os.path.exists(table)):
+        append_table(rows, table, new=follower.rewound)
+    follower.save()
+    return rows
+
+
+def follow(filename: str, table: str | None = None) -> list[dict]:
+    """
+    poll() with the state persisted in {filename}.follow
+    """
+    return poll(CastepFollower.load(filename), table)
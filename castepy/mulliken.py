@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+import os
+import mmap
+import numpy as np
+
+
+MULLIKEN_HEADER = b'Atomic Populations (Mulliken)'
+
+
+def mulliken_row(temp: str, polarised: bool = False) -> tuple[str, float, float] | None:
+    """
+    (species, charge, spin) of a stripped row of a Mulliken population table;
+    polarised is whether the table header has a spin column
+
+    Works for all spellings of the table header, i.e. with and without the
+    f column and with 'Charge (e)  Spin (hbar/2)' or 'Charge(e)   Spin(hbar/2)'.
+    Spin-polarised tables hold charge and spin in the last two columns of one
+    row per ion, which may be followed by a 'dn:' row (the row itself then
+    has 'up:'); None is returned for 'dn:' rows. Spin-unpolarised tables only
+    have the charge, the spin is then 0.
+    """
+    tokens = temp.split()
+    if 'dn:' in tokens[:1]:
+        return None
+    if polarised or 'up:' in tokens:
+        return tokens[0], float(tokens[-2]), float(tokens[-1])
+    return tokens[0], float(tokens[-1]), 0.0
+
+
+class Mulliken:
+    """
+    All Mulliken population blocks of a .castep file
+
+        species: (n_ions,) species labels
+        charge:  (n_blocks, n_ions) charge (e) per ion
+        spin:    (n_blocks, n_ions) spin (hbar/2) per ion
+        polarised: whether the tables have a spin column (otherwise the
+                   spins are all 0)
+
+    Blocks with a different number of ions than the last one (e.g. from
+    an earlier run of a concatenated file) are dropped.
+    """
+
+    def __init__(self, species: np.ndarray, charge: np.ndarray, spin: np.ndarray,
+        polarised: bool = False
+    ):
+        self.species = species
+        self.charge = charge
+        self.spin = spin
+        self.polarised = polarised
+
+    def __len__(self):
+        return len(self.charge)
+
+    @ classmethod
+    def from_file(cls, filename: str, start: int = 0, end: int | None = None):
+        """
+        Jump from one 'Atomic Populations (Mulliken)' header to the next through
+        a memory map, so that only the population tables themselves are split
+        into lines; everything in between is skipped at memory speed.
+        """
+        blocks, polarised = [], False
+        if end is None:
+            end = os.path.getsize(filename)
+
+        if end > start:
+            with open(filename, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pos = mm.find(MULLIKEN_HEADER, start, end)
+                while pos != -1:
+                    mm.seek(pos)
+                    block, nrules, spin = [], 0, False
+                    while nrules < 2 and mm.tell() < end:
+                        temp = mm.readline().decode(errors='replace').strip()
+                        if temp.startswith('=='):
+                            nrules += 1
+                        elif nrules == 0 and 'Spin' in temp:
+                            # column headings: '... Charge (e)  Spin (hbar/2)'
+                            polarised = spin = True
+                        elif nrules == 1 and temp:
+                            row = mulliken_row(temp, spin)
+                            if row is not None:
+                                block.append(row)
+                    if nrules == 2 and block:
+                        blocks.append(block)
+                    pos = mm.find(MULLIKEN_HEADER, mm.tell(), end)
+
+        return cls.from_blocks(blocks, polarised=polarised)
+
+    @ classmethod
+    def from_seed(cls, seed: str):
+        return cls.from_file(f"{seed}.castep")
+
+    @ classmethod
+    def from_blocks(cls, blocks: list[list[tuple[str, float, float]]], polarised: bool = False):
+        if not blocks:
+            return cls(np.empty(0, dtype=str), np.empty((0, 0)), np.empty((0, 0)), polarised)
+
+        nions = len(blocks[-1])
+        blocks = [block for block in blocks if len(block) == nions]
+
+        species = np.array([element for element, _, _ in blocks[-1]])
+        values = np.array(
+            [[(charge, spin) for _, charge, spin in block] for block in blocks],
+            dtype=float
+        )
+        return cls(species, values[:, :, 0], values[:, :, 1], polarised)
+
+    def total_spin(self) -> np.ndarray:
+        """
+        Total spin (hbar/2) per block
+        """
+        return self.spin.sum(axis=1)
+
+    def species_spin(self, block: int = -1) -> dict[str, float]:
+        """
+        Mean spin (hbar/2) per species in one block (default: the last one)
+        """
+        return {
+            str(element): float(self.spin[block, self.species == element].mean())
+            for element in dict.fromkeys(self.species)
+        }
+
+
+def read_mulliken(filename: str) -> Mulliken:
+    return Mulliken.from_file(filename)
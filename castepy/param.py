@@ -1,7 +1,19 @@
 
 
+import os
+import re
+
+try:
+    from .files import write_atomic, load_many
+except ImportError:
+    from files import write_atomic, load_many
+
+
 seed = 'Ni-surf_556_3L-slab'
 
+# 'keyword : value' (first word of the value); comments and block lines never match
+PARAM_LINE = re.compile(r'^[ \t]*([^#\s:][^:\n]*?)[ \t]*:[ \t]*(\S*)', re.MULTILINE)
+
 
 class Param:
 
@@ -9,6 +21,8 @@ class Param:
         self.seed = seed
         self.filename = seed + ".param"
         self.param = param
+        self._saved = None
+        self._saved_file = None
 
 
     def __str__(self):
@@ -40,17 +54,27 @@ class Param:
                 value is the parameter's value.
         """
         seed = filename.replace('.param', '')
-        param = {}
         with open(f"{seed}.param", 'r') as f:
-            for line in f:
-                if not line.strip() or line.strip().startswith('#') or ':' not in line:
-                    continue
-                keyword, value = line.split(':', 1)
-                value = value.split()[0] if value.split() else ''
-                param[keyword.strip().lower()] = value.strip().lower()
+            param = cls.from_text(seed, f.read())
+        param._mark_saved(f"{seed}.param")
+        return param
 
+    @ classmethod
+    def from_text(cls, seed: str, text: str):
+        param = {
+            keyword.lower(): value.lower()
+            for keyword, value in PARAM_LINE.findall(text)
+        }
         return cls(seed, param=param)
 
+    @ classmethod
+    def load_many(cls, filenames: list[str], processes: int | None = 1, chunksize: int = 64):
+        """
+        Param.from_file() of every file, in order; processes other than 1
+        spreads the files over a process pool (None: all cores)
+        """
+        return load_many(cls.from_file, filenames, processes, chunksize)
+
 
     @ classmethod
     def from_seed(cls, seed: str):
@@ -89,13 +113,22 @@ class Param:
         }
         return cls(seed='gencell', param=param)
 
+    def snapshot(self, link: bool = False) -> str:
+        """
+        Save {seed}.param as it is on disk into the project snapshot store
+        (see snapshot.py) and return its hash
+        """
+        try:
+            from .snapshot import snapshot
+        except ImportError:
+            from snapshot import snapshot
+        return snapshot([f"{self.seed}.param"], link=link)[0]
+
     def copy_to_md5(self):
-        import hashlib
-        with open(f"{self.seed}.param", 'rb') as fin:
-            bytes = fin.read()
-            hash = hashlib.md5(bytes).hexdigest()
-            with open(f"{self.seed}.param.{hash[:8]}", 'wb') as fout:
-                fout.write(bytes)
+        """
+        Former {seed}.param.<md5> copies, now a snapshot()
+        """
+        return self.snapshot()
 
     def to_str(self, keys: list[str] = None):
         if keys is None:
@@ -106,11 +139,35 @@ class Param:
         ]) + "\n"
 
                                                                                                                         
-    def to_file(self, filename: str | None = None):                                                                     
-        if filename == None:                                                                                            
-            filename = f"{self.seed}.param"                                                                              
-        with open(filename, 'w') as f:                                                                                  
-            f.write(str(self))         
+    def to_file(self, filename: str | None = None, force: bool = False) -> bool:
+        """
+        Write through a temporary file and an atomic rename. Nothing is
+        written if the parameters are unchanged since they were read from
+        (or written to) the same file, unless force. Returns whether the
+        file was written.
+        """
+        if filename == None:
+            filename = f"{self.seed}.param"
+        if not force and self._saved_file == os.path.abspath(filename) and not self.changed():
+            return False
+        write_atomic(filename, str(self))
+        self._mark_saved(filename)
+        return True
+
+    def _mark_saved(self, filename):
+        self._saved_file = os.path.abspath(filename)
+        self._saved = {k: str(v) for k, v in self.param.items()}
+
+    def changed(self) -> list[str]:
+        """
+        Keywords added, removed or modified since the parameters were read
+        or last written (all of them for new parameters)
+        """
+        if self._saved is None:
+            return list(self.param)
+        changed = [k for k in self._saved if k not in self.param]
+        changed += [k for k, v in self.param.items() if self._saved.get(k) != str(v)]
+        return changed
 
     def as_dict(self):
         return self.param
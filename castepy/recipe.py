@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+
+import os
+import glob
+import json
+from functools import partial
+from dataclasses import dataclass, field
+from multiprocessing import Pool
+
+from .cell import Cell, Lattice, Positions
+from .param import Param
+
+
+@dataclass
+class Recipe:
+    """
+    Setter calls applied to the .cell and .param of a seed, e.g. (JSON)
+
+        {
+            "snapshot": true,
+            "cell": [["set_spin", "mp"], ["set_kpoints", 0.05], "set_symmetry"],
+            "param": [{"set_scf_tol": "medium"}, {"set_extra_bands": {"perc": 20}}]
+        }
+
+    A step is the name of a set_* method, [name, *args] or {name: value}
+    where a list value gives *args, a mapping **kwargs and anything else
+    the single argument.
+    """
+    cell: list = field(default_factory=list)
+    param: list = field(default_factory=list)
+    snapshot: bool = False
+
+    @ classmethod
+    def from_dict(cls, recipe: dict):
+        recipe = cls(
+            cell=[_step(s) for s in recipe.get('cell', [])],
+            param=[_step(s) for s in recipe.get('param', [])],
+            snapshot=bool(recipe.get('snapshot', False))
+        )
+        for obj, steps in [(Cell, recipe.cell), (Param, recipe.param)]:
+            for name, _, _ in steps:
+                if not name.startswith('set_') or not callable(getattr(obj, name, None)):
+                    raise ValueError(f"{obj.__name__}.{name} is not a setter")
+        return recipe
+
+    @ classmethod
+    def from_file(cls, filename: str):
+        with open(filename, 'r') as f:
+            if filename.endswith('.yaml') or filename.endswith('.yml'):
+                import yaml
+                return cls.from_dict(yaml.safe_load(f))
+            return cls.from_dict(json.load(f))
+
+
+def _step(step) -> tuple[str, list, dict]:
+    if isinstance(step, str):
+        return step, [], {}
+    if isinstance(step, (list, tuple)):
+        return step[0], list(step[1:]), {}
+    if isinstance(step, dict) and len(step) == 1:
+        (name, value), = step.items()
+        if isinstance(value, list):
+            return name, value, {}
+        if isinstance(value, dict):
+            return name, [], value
+        return name, [value], {}
+    raise ValueError(f"invalid recipe step: {step!r}")
+
+
+@dataclass
+class RecipeResult:
+    seed: str
+    cell: list[str] = field(default_factory=list)
+    param: list[str] = field(default_factory=list)
+    error: str | None = None
+
+    def summary(self) -> str:
+        if self.error is not None:
+            return f"{self.seed}: {self.error}"
+        lines = []
+        for ext, changes in [('cell', self.cell), ('param', self.param)]:
+            lines.append(f"{self.seed}.{ext}: " + (", ".join(changes) if changes else "unchanged"))
+        return "\n".join(lines)
+
+
+def _describe(changed: list[str], before: dict, after: dict) -> list[str]:
+    changes = []
+    for key in changed:
+        if key not in before:
+            changes.append(f"+{key}")
+        elif key not in after:
+            changes.append(f"-{key}")
+        elif isinstance(after[key], (list, Lattice, Positions)):
+            changes.append(f"{key} (block)")
+        else:
+            old, new = (repr(v) if v == '' else v for v in (before[key], after[key]))
+            changes.append(f"{key} {old} -> {new}")
+    return changes
+
+
+def _apply(obj, steps):
+    before = dict(obj.cell if isinstance(obj, Cell) else obj.param)
+    for name, args, kwargs in steps:
+        getattr(obj, name)(*args, **kwargs)
+    after = obj.cell if isinstance(obj, Cell) else obj.param
+    return _describe(obj.changed(), before, after)
+
+
+def apply_recipe(seed: str, recipe: Recipe, write: bool = True) -> RecipeResult:
+    """
+    Read the inputs of seed once, apply the recipe and write back only
+    what changed (snapshotting the old files first if the recipe says so)
+    """
+    result = RecipeResult(seed)
+    try:
+        for ext, cls, steps in [('cell', Cell, recipe.cell), ('param', Param, recipe.param)]:
+            if not steps:
+                continue
+            obj = cls.from_seed(seed)
+            changes = _apply(obj, steps)
+            setattr(result, ext, changes)
+            if changes and write:
+                if recipe.snapshot:
+                    obj.snapshot()
+                obj.to_file()
+    except Exception as err:
+        result.error = f"{type(err).__name__}: {err}"
+    return result
+
+
+def find_seeds(patterns: list[str]) -> list[str]:
+    """
+    Seeds of the files matching glob patterns (e.g. '*.cell', 'runs/*/*.param')
+    """
+    seeds = set()
+    for pattern in patterns:
+        for filename in glob.glob(pattern):
+            seed, ext = os.path.splitext(filename)
+            if ext in ('.cell', '.param'):
+                seeds.add(seed)
+    return sorted(seeds)
+
+
+def run_recipe(recipe: Recipe, seeds: list[str], processes: int | None = 1,
+    chunksize: int = 16, write: bool = True
+):
+    """
+    Yield the RecipeResult of every seed, in order, applying the recipe
+    across a process pool unless processes is 1
+    """
+    func = partial(apply_recipe, recipe=recipe, write=write)
+    if processes == 1:
+        yield from map(func, seeds)
+        return
+
+    with Pool(processes=processes) as pool:
+        yield from pool.imap(func, seeds, chunksize=chunksize)
@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+
+import os
+import re
+import glob
+import time
+import signal
+import subprocess
+import numpy as np
+
+from .castep import CastepParser
+from .cell import Cell
+from .files import set_keyword, comment_keyword
+from .mulliken import Mulliken
+
+
+class RunMonitor:
+    """
+    Line-driven watcher of the output of one CASTEP run, fed while the run
+    is going: geometry iterations and their enthalpies, the outcome of the
+    optimisation, the end of the run and errors. A CastepParser is fed too
+    for the final pressure, enthalpy and volume.
+    """
+
+    def __init__(self):
+        self.enthalpies = []
+        self.converged = None
+        self.finished = False
+        self.error = None
+        self.parser = CastepParser()
+
+    def feed(self, line: str):
+        self.parser.feed(line)
+        if '<-- SCF' in line:
+            return
+        temp = line.strip()
+
+        if ': finished iteration' in temp:
+            value = temp.split('enthalpy=')[1].split()[0] if 'enthalpy=' in temp else 'nan'
+            self.enthalpies.append(float(value))
+        elif 'Geometry optimization' in temp:
+            # 'LBFGS: Geometry optimization completed successfully.' or '... failed to converge'
+            outcome = temp.split('Geometry optimization', 1)[1].split()
+            self.converged = bool(outcome) and outcome[0] == 'completed'
+        elif temp.startswith('Total time'):
+            self.finished = True
+        elif temp.startswith('Error') or '*** Error' in temp:
+            self.error = temp
+
+    def close(self):
+        self.parser.close()
+
+    @ property
+    def run(self):
+        return self.parser.runs[-1] if self.parser.runs else None
+
+
+def _tail(filename: str, offset: int, rest: bytes = b'') -> tuple[list[str], int, bytes]:
+    """
+    Complete lines appended to a file since offset, the new offset and the
+    incomplete last line
+    """
+    try:
+        with open(filename, 'rb') as f:
+            f.seek(offset)
+            chunk = rest + f.read()
+    except FileNotFoundError:
+        return [], offset, rest
+    offset += len(chunk) - len(rest)
+    end = chunk.rfind(b'\n') + 1
+    lines = chunk[:end].decode(errors='replace').splitlines(keepends=True)
+    return lines, offset, chunk[end:]
+
+
+def run_castep(exe: str, seed: str, interval: float = 1.0) -> tuple[RunMonitor, int]:
+    """
+    Run '{exe} {seed}' (through the shell, as 'mpirun -n 4 castep.mpi') and
+    feed what it appends to {seed}.castep to a RunMonitor while it runs. The
+    run is stopped as soon as an error shows up in the output or a
+    {seed}.*.err file appears. Returns the monitor and the offset in the
+    .castep at which the run started.
+    """
+    filename = f"{seed}.castep"
+    start = os.path.getsize(filename) if os.path.exists(filename) else 0
+    errors = set(glob.glob(f"{seed}.*.err"))
+
+    monitor = RunMonitor()
+    offset, rest = start, b''
+    process = subprocess.Popen(f"{exe} {seed}", shell=True, start_new_session=True)
+    try:
+        while True:
+            done = process.poll() is not None
+            lines, offset, rest = _tail(filename, offset, rest)
+            for line in lines:
+                monitor.feed(line)
+            if done:
+                break
+            if monitor.error is None and set(glob.glob(f"{seed}.*.err")) - errors:
+                monitor.error = f"{seed}.*.err written"
+            if monitor.error is not None:
+                os.killpg(process.pid, signal.SIGTERM)
+                process.wait()
+                break
+            time.sleep(interval)
+    finally:
+        if process.poll() is None:
+            os.killpg(process.pid, signal.SIGTERM)
+            process.wait()
+
+    if rest:
+        monitor.feed(rest.decode(errors='replace'))
+    monitor.close()
+    return monitor, start
+
+
+TITL_COUNT = re.compile(r'^(TITL.*\sn\s+-\s+)(\d+)', re.MULTILINE)
+
+
+def count_seen(filename: str):
+    """
+    Add one to the number of times a structure was found (the last field of
+    the TITL record of its .res file)
+    """
+    with open(filename, 'r') as f:
+        text = f.read()
+    text = TITL_COUNT.sub(lambda m: f"{m.group(1)}{int(m.group(2)) + 1}", text, count=1)
+    temp = f"{filename}.work"
+    with open(temp, 'w') as f:
+        f.write(text)
+    os.replace(temp, filename)
+
+
+class Relaxation:
+    """
+    Self-consistent geometry optimisation of a seed with repeated CASTEP
+    runs, as the castep_relax scripts of AIRSS:
+
+        maxit > 0: three short runs, then runs until the optimiser has
+                   converged in consecutive runs (success counts down from
+                   3, a run that does not converge sets it back to 3) or
+                   maxit geometry iterations are done over all runs
+        maxit < 0: a single point energy (no task) only
+        maxit = 0: a single run
+
+    After every run the cell takes the lattice, positions and (if there are
+    spins) Mulliken spins of the run; symm > 0 symmetrises with that
+    tolerance (through the SymmetryCache of the directory), sim > 0 stops if the structure is already in the directory.
+    The output of a run is only parsed as it is written, so the cost of a
+    cycle does not grow with the .castep file.
+    """
+
+    def __init__(self, seed: str, exe: str, maxit: int = 0, sim: float = 0.0, symm: float = 0.0,
+        short_runs: bool = True, interval: float = 1.0
+    ):
+        self.seed = seed
+        self.exe = exe
+        self.maxit = maxit
+        self.sim = sim
+        self.symm = symm
+        self.short_runs = short_runs
+        self.interval = interval
+
+        if symm != 0:
+            # fail now rather than after the first run
+            from .symmetry import _spglib
+            _spglib()
+
+        self.cell = Cell.from_file(f"{seed}.cell")
+        self.success = 3
+        self.status = None
+        self.monitor = None
+        self.start = 0
+
+        # iterations so far, including those of earlier runs in the .castep
+        self.enthalpies = []
+        if os.path.exists(f"{seed}.castep"):
+            with open(f"{seed}.castep", 'r', errors='replace') as f:
+                monitor = RunMonitor()
+                for line in f:
+                    if ': finished iteration' in line:
+                        monitor.feed(line)
+            self.enthalpies = monitor.enthalpies
+
+    def _sync_spin(self):
+        # the spin in the param must be the total of the spins in the cell;
+        # only that line is changed, the rest of the param is left as it is
+        spins = self.cell.spins
+        if spins is not None and not np.all(np.isnan(spins)):
+            set_keyword(f"{self.seed}.param", 'spin', f"{np.nansum(spins):g}")
+
+    def run_castep(self) -> bool:
+        """
+        One CASTEP run; False if it crashed
+        """
+        self._sync_spin()
+        self.cell.to_file()
+
+        self.monitor, self.start = run_castep(self.exe, self.seed, self.interval)
+        self.enthalpies += self.monitor.enthalpies
+        with open(f"{self.seed}.conv", 'w') as f:
+            f.write("".join(f"{value:g}\n" for value in self.enthalpies) + "\n")
+
+        if self.monitor.error is not None or not self.monitor.finished:
+            self.status = 'crashed'
+            return False
+
+        if self.monitor.converged:
+            if self.success > 1:
+                self.success -= 1
+        else:
+            self.success = 3
+
+        if len(self.enthalpies) >= self.maxit:
+            self.success = 1
+        return True
+
+    def new_cell(self) -> bool:
+        """
+        Take the structure of the last run into the cell; False if it is one
+        already in the directory
+        """
+        # no -out.cell after a single point energy
+        out = None
+        if os.path.exists(f"{self.seed}-out.cell"):
+            out = Cell.from_file(f"{self.seed}-out.cell")
+
+        if out is not None and self.symm != 0:
+            from .res import res_from_cell, cell_from_res
+            from .symmetry import SymmetryCache
+
+            # a run that did not move the structure gives the cached one
+            res = res_from_cell(out)
+            with SymmetryCache.for_directory('.') as cache:
+                structure = cache.analyse([res], self.symm)[0]['structure']
+            if structure is not None:
+                if len(structure.species) != len(res.species):
+                    self.success = 3
+                out = cell_from_res(structure)
+
+        if out is not None:
+            self.cell.set_structure(out)
+
+        spins = self.cell.spins
+        if spins is not None and not np.all(np.isnan(spins)):
+            mulliken = Mulliken.from_file(f"{self.seed}.castep", start=self.start)
+            if len(mulliken) and mulliken.spin.shape[1] == len(spins):
+                self.cell.set_spin(mulliken.spin[-1])
+
+        self.cell.to_file()
+
+        if self.sim != 0:
+            from .res import res_from_cell
+            from .similarity import FingerprintIndex
+
+            res = res_from_cell(self.cell)
+            with FingerprintIndex.for_directory('.') as index:
+                index.update('.', quick=True)
+                known = index.find(res, self.sim, exclude=res.seed)
+            if known:
+                count_seen(known[0][0])
+                self.status = 'known'
+                return False
+        return True
+
+    def cycle(self) -> bool:
+        return self.run_castep() and self.new_cell()
+
+    def relax(self) -> str:
+        """
+        Returns 'converged', 'crashed' or 'known' (the structure was found)
+        """
+        if not self.short_runs:
+            self.success = 2
+        elif self.maxit > 0:
+            self.success = 3
+            for _ in range(3):
+                if not self.cycle():
+                    return self.status
+        elif self.maxit < 0:
+            # single point energy: the task is commented out for one run
+            commented = comment_keyword(f"{self.seed}.param", 'task')
+            self.success = 3
+            try:
+                ok = self.cycle()
+            finally:
+                if commented:
+                    comment_keyword(f"{self.seed}.param", 'task', comment=False)
+            if not ok:
+                return self.status
+        else:
+            self.success = 2
+
+        while self.success > 1:
+            if not self.cycle():
+                return self.status
+
+        self.status = 'converged'
+        return self.status
+
+    def summary(self) -> dict:
+        run = self.monitor.run if self.monitor is not None else None
+        return {
+            'pressure': getattr(run, 'pressure', None),
+            'enthalpy': getattr(run, 'enthalpy', None),
+            'volume': getattr(run, 'final_volume', None),
+        }
@@ -0,0 +1,361 @@
+#!/usr/bin/env python
+
+import os
+import re
+import glob
+import shutil
+import numpy as np
+from dataclasses import dataclass, field
+
+from .cell import Cell, Lattice, Positions, abc_to_cart
+
+
+def _float(token: str) -> float:
+    try:
+        return float(token)
+    except ValueError:
+        return np.nan
+
+
+@dataclass
+class Res:
+    """
+    AIRSS .res file
+
+        TITL seed pressure volume enthalpy spin modspin [delec] nat (sym) n - 1
+        CELL wavelength a b c alpha beta gamma
+        SFAC element ...
+        element index x y z occupancy [spin]
+        END
+    """
+    seed: str
+    pressure: float = np.nan
+    volume: float = np.nan
+    enthalpy: float = np.nan
+    spin: float = np.nan
+    modspin: float = np.nan
+    delec: float | None = None
+    nat: int = 0
+    sym: str = ''
+    abc: np.ndarray = field(default_factory=lambda: np.full(6, np.nan))
+    species: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=str))
+    positions: np.ndarray = field(default_factory=lambda: np.empty((0, 3)))
+    occupancy: np.ndarray = field(default_factory=lambda: np.empty(0))
+    spins: np.ndarray = field(default_factory=lambda: np.empty(0))
+    rem: list[str] = field(default_factory=list)
+
+    @ classmethod
+    def from_file(cls, filename: str):
+        with open(filename, 'r') as f:
+            return cls.from_lines(f, seed=os.path.basename(filename)[:-len('.res')])
+
+    @ classmethod
+    def from_lines(cls, lines, seed: str | None = None):
+        """
+        Parse TITL, CELL and the atoms in a single pass
+        """
+        res = None
+        rem = []
+        abc = np.full(6, np.nan)
+        atoms = []
+        in_atoms = False
+
+        for line in lines:
+            if in_atoms:
+                tokens = line.split()
+                if not tokens:
+                    continue
+                if tokens[0] == 'END':
+                    break
+                atoms.append(tokens)
+            elif line.startswith('TITL'):
+                res = cls._from_titl(line.split(), seed)
+            elif line.startswith('CELL'):
+                abc[:] = [_float(token) for token in line.split()[2:8]]
+            elif line.startswith('SFAC'):
+                in_atoms = True
+            elif line.startswith('REM'):
+                rem.append(line[3:].strip())
+
+        if res is None:
+            raise ValueError(f"no TITL line in {seed}.res")
+
+        res.abc = abc
+        res.rem = rem
+        if atoms:
+            # element index x y z occupancy [spin]
+            res.species = np.array([atom[0] for atom in atoms], dtype=str)
+            values = np.zeros((len(atoms), 5))
+            for i, atom in enumerate(atoms):
+                row = atom[2:7]
+                values[i, :len(row)] = [_float(token) for token in row]
+            res.positions = values[:, :3]
+            res.occupancy = values[:, 3]
+            res.spins = values[:, 4]
+        return res
+
+    @ classmethod
+    def _from_titl(cls, tokens: list[str], seed: str | None):
+        # 13 tokens with the number of extra electrons (delec) before nat
+        delec = len(tokens) == 13
+        return cls(
+            seed=tokens[1] if len(tokens) > 1 else seed,
+            pressure=_float(tokens[2]),
+            volume=_float(tokens[3]),
+            enthalpy=_float(tokens[4]),
+            spin=_float(tokens[5]),
+            modspin=_float(tokens[6]),
+            delec=_float(tokens[7]) if delec else None,
+            nat=int(tokens[8 if delec else 7]),
+            sym=tokens[9 if delec else 8].strip('()'),
+        )
+
+    @ property
+    def lattice(self) -> np.ndarray:
+        return abc_to_cart(self.abc[:3], self.abc[3:])
+
+    def elements(self) -> list[str]:
+        """
+        Elements in order of first appearance
+        """
+        _, index = np.unique(self.species, return_index=True)
+        return [str(self.species[i]) for i in sorted(index)]
+
+    def element_spins(self) -> dict[str, tuple[float, float]]:
+        """
+        Mean spin and mean |spin| of the atoms of each element
+        """
+        elements, inverse, counts = np.unique(self.species, return_inverse=True, return_counts=True)
+        spin = np.bincount(inverse, weights=self.spins) / counts
+        modspin = np.bincount(inverse, weights=np.abs(self.spins)) / counts
+        return {str(e): (float(s), float(m)) for e, s, m in zip(elements, spin, modspin)}
+
+    def formula(self) -> str:
+        elements, counts = np.unique(self.species, return_counts=True)
+        return "".join(f"{e}{n if n > 1 else ''}" for e, n in zip(elements, counts))
+
+    def __str__(self):
+        def value(x, fmt):
+            return format(0.0 if x is None or np.isnan(x) else x, fmt)
+
+        titl = [
+            "TITL", self.seed, value(self.pressure, '.4f'), value(self.volume, '.4f'),
+            value(self.enthalpy, '.8f'), value(self.spin, '.2f'), value(self.modspin, '.2f')
+        ]
+        if self.delec is not None:
+            titl.append(value(self.delec, 'g'))
+        titl += [str(self.nat or len(self.species)), f"({self.sym or 'P1'})", "n", "-", "1"]
+
+        elements = self.elements()
+        sfac = {element: i + 1 for i, element in enumerate(elements)}
+        spins = bool(np.any(self.spins))
+
+        lines = [" ".join(titl)]
+        lines += [f"REM {rem}" for rem in self.rem]
+        lines += [
+            "CELL 1.54180 " + " ".join(f"{x:.6f}" for x in self.abc),
+            "LATT -1",
+            "SFAC " + " ".join(elements),
+        ]
+        for i, (element, (x, y, z)) in enumerate(zip(self.species, self.positions)):
+            line = f"{element:<4}{sfac[element]:>3} {x:16.13f} {y:16.13f} {z:16.13f} {self.occupancy[i]:.6f}"
+            if spins:
+                line += f" {self.spins[i]:8.4f}"
+            lines.append(line)
+        lines.append("END")
+        return "\n".join(lines) + "\n"
+
+    def to_file(self, filename: str | None = None):
+        if filename is None:
+            filename = f"{self.seed}.res"
+        with open(filename, 'w') as f:
+            f.write(str(self))
+
+
+RES_COLUMNS = ['seed', 'pressure', 'volume', 'enthalpy', 'spin', 'modspin', 'delec', 'nat', 'sym']
+
+
+def res_record(res: Res) -> dict:
+    """
+    Scalar summary of a Res with spin_<element> / modspin_<element> means
+    (the columns of df_mag.csv)
+    """
+    record = {name: getattr(res, name) for name in RES_COLUMNS}
+    for element, (spin, modspin) in res.element_spins().items():
+        record[f"spin_{element}"] = spin
+        record[f"modspin_{element}"] = modspin
+    return record
+
+
+def res_summary(path: str) -> dict:
+    """
+    res_record() of a .res file (the 'res' records of the parse cache)
+    """
+    return res_record(Res.from_file(path))
+
+
+def load_res_dir(directory: str = '.', pattern: str = '*.res', files: list[str] | None = None,
+    cache=None
+) -> dict[str, np.ndarray]:
+    """
+    Summaries of every .res file of a directory as columns of one table
+    (dict of equally long arrays, e.g. for pandas.DataFrame). The columns are
+    allocated once for all files; per-element spin columns are added as
+    elements appear and are NaN for structures without that element.
+    Files that cannot be parsed are left out. With a ParseCache, files
+    unchanged since they were summarised are not read again.
+    """
+    if files is None:
+        files = sorted(glob.glob(os.path.join(directory, pattern)))
+    n = len(files)
+
+    table = {
+        'seed': np.empty(n, dtype=object),
+        'pressure': np.full(n, np.nan),
+        'volume': np.full(n, np.nan),
+        'enthalpy': np.full(n, np.nan),
+        'spin': np.full(n, np.nan),
+        'modspin': np.full(n, np.nan),
+        'delec': np.full(n, np.nan),
+        'nat': np.zeros(n, dtype=int),
+        'sym': np.empty(n, dtype=object),
+    }
+
+    i = 0
+    for filename in files:
+        try:
+            if cache is None:
+                record = res_summary(filename)
+            else:
+                record = cache.cached(filename, 'res', res_summary)
+        except (OSError, ValueError, IndexError):
+            continue
+        for name, value in record.items():
+            if name not in table:
+                table[name] = np.full(n, np.nan)
+            table[name][i] = np.nan if value is None else value
+        i += 1
+
+    return {name: column[:i] for name, column in table.items()}
+
+
+TITL_SEED = re.compile(rb'^(TITL[ \t]+)(\S+)', re.MULTILINE)
+
+
+def retitle(filename: str, seed: str | None = None) -> str:
+    """
+    Set the seed in the TITL record of a .res file (default: the file name)
+    without touching anything else. A title of the same length is written
+    over in place; otherwise the file is rewritten once through a temporary
+    file and an atomic rename.
+
+    Returns 'unchanged', 'in-place' or 'rewritten'.
+    """
+    if seed is None:
+        seed = os.path.basename(filename)[:-len('.res')]
+    new = seed.encode()
+
+    with open(filename, 'rb') as f:
+        head = f.read(1 << 16)
+        match = TITL_SEED.search(head)
+        if match is None and len(head) == 1 << 16:
+            head += f.read()
+            match = TITL_SEED.search(head)
+    if match is None:
+        raise ValueError(f"no TITL line in {filename}")
+
+    old = match.group(2)
+    if old == new:
+        return 'unchanged'
+
+    if len(old) == len(new):
+        with open(filename, 'r+b') as f:
+            f.seek(match.start(2))
+            f.write(new)
+        return 'in-place'
+
+    directory, basename = os.path.split(os.path.abspath(filename))
+    temp = os.path.join(directory, f".{basename}.{os.getpid()}.tmp")
+    try:
+        with open(filename, 'rb') as fin, open(temp, 'wb') as fout:
+            fout.write(head[:match.start(2)])
+            fout.write(new)
+            fin.seek(match.end(2))
+            shutil.copyfileobj(fin, fout, 1 << 20)
+        shutil.copymode(filename, temp)
+        os.replace(temp, filename)
+    except BaseException:
+        if os.path.exists(temp):
+            os.unlink(temp)
+        raise
+    return 'rewritten'
+
+
+def retitle_dir(directory: str = '.', pattern: str = '*.res', threads: int | None = None) -> dict[str, int]:
+    """
+    retitle() every .res file of a directory, optionally with a thread pool
+    to overlap the I/O on networked filesystems; returns counts per outcome
+    """
+    files = sorted(glob.glob(os.path.join(directory, pattern)))
+
+    def run(filename):
+        try:
+            return retitle(filename)
+        except (OSError, ValueError):
+            return 'failed'
+
+    if threads:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            outcomes = list(executor.map(run, files))
+    else:
+        outcomes = [run(filename) for filename in files]
+
+    counts = {'unchanged': 0, 'in-place': 0, 'rewritten': 0, 'failed': 0}
+    for outcome in outcomes:
+        counts[outcome] += 1
+    return counts
+
+
+def res_from_cell(cell: Cell, seed: str | None = None, **titl) -> Res:
+    """
+    Res of the structure of a Cell (lattice, fractional positions, species
+    and SPIN= values, 0 where not given); TITL values can be passed as
+    keywords (pressure, enthalpy, ...), the volume is that of the lattice
+    """
+    lattice = Lattice(cell.lattice)
+    positions = cell.positions
+    if 'positions_abs' in cell.cell:
+        positions = positions @ np.linalg.inv(lattice.vectors)
+    lengths, angles = lattice.abc()
+    n = len(cell.species)
+
+    titl.setdefault('volume', abs(float(np.linalg.det(lattice.vectors))))
+    titl.setdefault('nat', n)
+    titl.setdefault('sym', 'P1')
+    return Res(
+        seed=seed or os.path.basename(cell.seed),
+        abc=np.concatenate([lengths, angles]),
+        species=np.array(cell.species, dtype=str),
+        positions=np.array(positions, dtype=float),
+        occupancy=np.ones(n),
+        spins=np.nan_to_num(cell.spins, nan=0.0),
+        **titl
+    )
+
+
+def cell_from_res(res: Res, seed: str | None = None, spins: bool | None = None) -> Cell:
+    """
+    Cell with the LATTICE_CART and POSITIONS_FRAC of a Res; SPIN= is
+    written if spins, by default if any spin is not zero
+    """
+    if spins is None:
+        spins = bool(np.any(res.spins))
+    positions = Positions(
+        res.species.copy(), res.positions.copy(),
+        spins=res.spins.copy() if spins else None
+    )
+    return Cell(seed=seed or res.seed, cell={
+        'lattice_cart': Lattice(res.lattice),
+        'positions_frac': positions,
+    })
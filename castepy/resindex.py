@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+
+import os
+import re
+import math
+import sqlite3
+from functools import reduce
+from multiprocessing import Pool
+
+from .res import Res
+
+
+def reduced_formula(counts: dict[str, int]) -> str:
+    """
+    Formula with elements in alphabetical order and counts divided by their
+    greatest common divisor, e.g. {'O': 4, 'Li': 2, 'Co': 2} -> 'CoLiO2'
+    """
+    counts = {e: int(n) for e, n in counts.items() if n}
+    if not counts:
+        return ''
+    divisor = reduce(math.gcd, counts.values())
+    return "".join(
+        f"{e}{n // divisor if n // divisor > 1 else ''}" for e, n in sorted(counts.items())
+    )
+
+
+def parse_formula(formula: str) -> dict[str, int]:
+    counts = {}
+    for element, n in re.findall(r'([A-Z][a-z]?)(\d*)', formula):
+        counts[element] = counts.get(element, 0) + (int(n) if n else 1)
+    return counts
+
+
+def res_row(path: str) -> tuple:
+    """
+    (path, seed, formula, pressure, volume, enthalpy, enthalpy per atom,
+    spin, modspin, natoms, space group) of a .res file, all None but the
+    path if it cannot be parsed
+    """
+    try:
+        res = Res.from_file(path)
+    except (OSError, ValueError, IndexError):
+        return (path,) + (None,) * 10
+    natoms = len(res.species) or res.nat
+    counts = {}
+    for element in res.species:
+        counts[str(element)] = counts.get(str(element), 0) + 1
+    return (
+        path, res.seed, reduced_formula(counts), res.pressure, res.volume, res.enthalpy,
+        res.enthalpy / natoms if natoms else None, res.spin, res.modspin, natoms, res.sym
+    )
+
+
+def update_files(db: sqlite3.Connection, table: str, directory: str, row, processes: int | None = 1,
+    chunksize: int = 64, quick: bool = False
+) -> tuple[int, int]:
+    """
+    Bring a table of .res files (path, size, mtime_ns, then the rest of
+    row(path)) up to date with a directory: only files that are new or
+    whose size or mtime changed are passed to row() (across a process pool
+    unless processes is 1), and files that are gone are dropped. With
+    quick, files already in the table are taken as unchanged and not even
+    stat'ed, so that only new files cost anything (as when AIRSS adds .res
+    files to a directory but never rewrites them); files that could not be
+    parsed (no seed, e.g. still being written) are checked as usual.
+    Returns the number of files (re)indexed and the number of files
+    removed.
+    """
+    directory = os.path.abspath(directory)
+    indexed, parsed = {}, set()
+    for path, size, mtime_ns, seed in db.execute(f"SELECT path, size, mtime_ns, seed FROM {table}"):
+        if os.path.dirname(path) == directory:
+            indexed[path] = (size, mtime_ns)
+            if seed is not None:
+                parsed.add(path)
+
+    changed = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.name.endswith('.res') or not entry.is_file():
+                continue
+            if quick and entry.path in parsed:
+                del indexed[entry.path]
+                continue
+            stat = entry.stat()
+            identity = (stat.st_size, stat.st_mtime_ns)
+            if indexed.pop(entry.path, None) != identity:
+                changed[entry.path] = identity
+
+    if processes == 1:
+        rows = map(row, list(changed))
+    else:
+        pool = Pool(processes=processes)
+        rows = pool.imap_unordered(row, list(changed), chunksize=chunksize)
+
+    try:
+        # files that cannot be parsed are kept too (without values),
+        # so that they are not parsed again until they change
+        for values in rows:
+            values = values[:1] + changed[values[0]] + values[1:]
+            db.execute(f"INSERT OR REPLACE INTO {table} VALUES ({', '.join('?' * len(values))})", values)
+    finally:
+        if processes != 1:
+            pool.close()
+            pool.join()
+
+    db.executemany(f"DELETE FROM {table} WHERE path = ?", [(path,) for path in indexed])
+    db.commit()
+    return len(changed), len(indexed)
+
+
+INDEX_COLUMNS = [
+    'path', 'seed', 'formula', 'pressure', 'volume', 'enthalpy', 'enthalpy_per_atom',
+    'spin', 'modspin', 'natoms', 'sym'
+]
+
+
+class ResIndex:
+    """
+    SQLite index of .res files (by default .castepy/res.sqlite in the
+    directory indexed). update() only parses files that are new or whose
+    size or mtime changed, and drops files that are gone.
+    """
+
+    def __init__(self, filename: str):
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        self.db = sqlite3.connect(filename, timeout=60)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS res (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                seed TEXT,
+                formula TEXT,
+                pressure REAL,
+                volume REAL,
+                enthalpy REAL,
+                enthalpy_per_atom REAL,
+                spin REAL,
+                modspin REAL,
+                natoms INTEGER,
+                sym TEXT
+            );
+            CREATE INDEX IF NOT EXISTS res_formula ON res (formula, enthalpy_per_atom);
+            CREATE INDEX IF NOT EXISTS res_enthalpy ON res (enthalpy_per_atom);
+        """)
+
+    @ classmethod
+    def for_directory(cls, directory: str):
+        return cls(os.path.join(directory, '.castepy', 'res.sqlite'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def update(self, directory: str, processes: int | None = 1, chunksize: int = 64,
+        quick: bool = False
+    ) -> tuple[int, int]:
+        """
+        Index the .res files of a directory (see update_files()); returns
+        the number of files (re)indexed and the number of files removed
+        """
+        return update_files(self.db, 'res', directory, res_row, processes, chunksize, quick)
+
+    def lowest(self, n: int = 50, formula: str | None = None, window: float | None = None,
+        pressure: float | None = None
+    ) -> list[dict]:
+        """
+        Structures of lowest enthalpy per atom, optionally of one composition
+        (any formula unit, e.g. 'LiCoO2' or 'Li2Co2O4'), at one pressure and
+        within window (eV/atom) of the lowest of them
+        """
+        where = ["enthalpy_per_atom IS NOT NULL"]
+        values = []
+        if formula is not None:
+            where.append("formula = ?")
+            values.append(reduced_formula(parse_formula(formula)))
+        if pressure is not None:
+            where.append("abs(pressure - ?) < 1e-6")
+            values.append(pressure)
+        condition = " AND ".join(where)
+
+        if window is not None:
+            minimum, = self.db.execute(
+                f"SELECT MIN(enthalpy_per_atom) FROM res WHERE {condition}", values
+            ).fetchone()
+            if minimum is None:
+                return []
+            condition += " AND enthalpy_per_atom <= ?"
+            values = values + [minimum + window]
+
+        cursor = self.db.execute(
+            f"SELECT {', '.join(INDEX_COLUMNS)} FROM res WHERE {condition} "
+            f"ORDER BY enthalpy_per_atom LIMIT ?",
+            values + [n]
+        )
+        return [dict(zip(INDEX_COLUMNS, row)) for row in cursor]
+
+    def formulas(self) -> dict[str, int]:
+        return dict(self.db.execute(
+            "SELECT formula, COUNT(*) FROM res WHERE formula IS NOT NULL GROUP BY formula ORDER BY formula"
+        ).fetchall())
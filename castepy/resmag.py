@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+
+import os
+import re
+import sys
+import csv
+import glob
+from multiprocessing import Pool
+
+from .res import RES_COLUMNS, res_summary
+from .cache import ParseCache
+
+
+# one row per .res file; per-element columns spin_<element>, modspin_<element>
+MAG_COLUMNS = ['file'] + RES_COLUMNS + ['error']
+
+
+def mag_columns(elements: list[str]) -> list[str]:
+    return MAG_COLUMNS + [
+        f"{name}_{element}" for element in elements for name in ['spin', 'modspin']
+    ]
+
+
+def summarise_res(path: str) -> dict:
+    """
+    res_record() of a file, or a row with the error message
+    """
+    try:
+        record = res_summary(path)
+    except Exception as err:
+        return {'file': path, 'error': f"{type(err).__name__}: {err}"}
+    record['file'] = path
+    record['error'] = None
+    return record
+
+
+def _summarise_new(path: str) -> tuple[tuple[int, int, int] | None, dict]:
+    """
+    summarise_res() in a worker, together with the identity of the file before parsing
+    """
+    try:
+        identity = ParseCache._identity(path)
+    except OSError:
+        identity = None
+    return identity, summarise_res(path)
+
+
+def _elements(record: dict) -> list[str]:
+    return [name[len('spin_'):] for name in record if name.startswith('spin_')]
+
+
+class CsvMagSink:
+    """
+    Append rows to a CSV file. An existing file is continued: a last line
+    cut short by an interrupted run is dropped, its error rows are dropped
+    (so those files are tried again) and the other files in it are reported
+    by done. widen() adds columns to the file.
+    """
+
+    def __init__(self, filename: str, columns: list[str] | None = None):
+        self.filename = filename
+        self.columns = columns
+        self.file = None
+        self.done = set()
+        if os.path.isfile(filename) and os.path.getsize(filename) > 0:
+            with open(filename, 'rb+') as f:
+                data = f.read()
+                f.truncate(data.rfind(b'\n') + 1)
+            errors = False
+            with open(filename, 'r', newline='') as f:
+                reader = csv.DictReader(f)
+                existing = reader.fieldnames
+                for row in reader:
+                    if row['error']:
+                        errors = True
+                    else:
+                        self.done.add(row['file'])
+            self.columns = existing + [name for name in columns or [] if name not in existing]
+            if errors or self.columns != existing:
+                self._rewrite(self.columns, errors=False)
+            self._append()
+
+    def _append(self):
+        self.file = open(self.filename, 'a', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=self.columns, extrasaction='ignore')
+
+    def _rewrite(self, columns: list[str], errors: bool = True):
+        """
+        Copy the file under columns (new ones empty), with or without its
+        error rows
+        """
+        temp = f"{self.filename}.{os.getpid()}.tmp"
+        with open(self.filename, 'r', newline='') as fin, open(temp, 'w', newline='') as fout:
+            writer = csv.DictWriter(fout, fieldnames=columns, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(row for row in csv.DictReader(fin) if errors or not row['error'])
+        os.replace(temp, self.filename)
+
+    def open(self, columns: list[str]):
+        if self.file is None:
+            self.columns = columns
+            self.file = open(self.filename, 'w', newline='')
+            self.writer = csv.DictWriter(self.file, fieldnames=self.columns, extrasaction='ignore')
+            self.writer.writeheader()
+
+    def widen(self, columns: list[str]):
+        """
+        Add columns (empty for the rows written so far)
+        """
+        if self.file is None:
+            # nothing written yet: open() writes the header
+            self.columns = columns
+            return
+        self.file.close()
+        self._rewrite(columns)
+        self.columns = columns
+        self._append()
+
+    def write(self, rows: list[dict]):
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+PART = re.compile(r'part-(\d+)\.parquet$')
+
+
+class ParquetMagSink:
+    """
+    Write rows as a Parquet dataset directory, one part file per run (and
+    per widen()) with a row group per batch. Part files left unreadable by an interrupted run
+    are removed and error rows are dropped from the others (so those files
+    are tried again); the files in them are reported by done. widen()
+    rewrites the parts with the new columns, so that all parts keep one
+    schema.
+    """
+
+    def __init__(self, directory: str, columns: list[str] | None = None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.pq = pq
+        self.directory = directory
+        self.columns = columns
+        self.done = set()
+        self.writer = None
+
+        os.makedirs(directory, exist_ok=True)
+        self.parts = []
+        for part in sorted(glob.glob(os.path.join(directory, 'part-*.parquet'))):
+            try:
+                table = pq.read_table(part, columns=['file', 'error'])
+                existing = pq.read_schema(part).names
+            except Exception:
+                os.unlink(part)
+                continue
+            self.parts.append(part)
+            self.done.update(
+                name for name, error in zip(table.column('file').to_pylist(), table.column('error').to_pylist())
+                if error is None
+            )
+            if table.column('error').null_count < len(table):
+                self._rewrite(part, existing, errors=False)
+            if self.columns is None:
+                self.columns = existing
+            else:
+                self.columns = existing + [name for name in self.columns if name not in existing]
+
+        if self.columns is not None and any(
+            pq.read_schema(part).names != self.columns for part in self.parts
+        ):
+            self.widen(self.columns)
+
+        # after the highest part, so that a gap in the numbering is not reused
+        numbers = [int(PART.search(part).group(1)) for part in self.parts]
+        self.part = os.path.join(directory, f"part-{max(numbers, default=-1) + 1:05d}.parquet")
+
+    def _schema(self, columns: list[str]):
+        pa = self.pa
+        return pa.schema([
+            (name, pa.string() if name in ('file', 'seed', 'sym', 'error')
+             else pa.int64() if name == 'nat' else pa.float64())
+            for name in columns
+        ])
+
+    def _rewrite(self, part: str, columns: list[str], errors: bool = True):
+        """
+        Copy a part under columns (new ones null), with or without its error
+        rows, one record batch at a time
+        """
+        pa = self.pa
+        schema = self._schema(columns)
+        temp = f"{part}.{os.getpid()}.tmp"
+        with self.pq.ParquetWriter(temp, schema) as writer:
+            for batch in self.pq.ParquetFile(part).iter_batches():
+                if not errors:
+                    batch = batch.filter(batch.column('error').is_null())
+                arrays = [
+                    batch.column(name) if name in batch.schema.names
+                    else pa.nulls(batch.num_rows, schema.field(name).type)
+                    for name in columns
+                ]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        os.replace(temp, part)
+
+    def open(self, columns: list[str]):
+        if self.columns is None:
+            self.columns = columns
+
+    def widen(self, columns: list[str]):
+        """
+        Add columns to every part (null for the rows written so far)
+        """
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.parts.append(self.part)
+            number = int(PART.search(self.part).group(1))
+            self.part = os.path.join(self.directory, f"part-{number + 1:05d}.parquet")
+        for part in self.parts:
+            if self.pq.read_schema(part).names != columns:
+                self._rewrite(part, columns)
+        self.columns = columns
+
+    def write(self, rows: list[dict]):
+        columns = {
+            name: [row.get(name) for row in rows] for name in self.columns
+        }
+        schema = self._schema(self.columns)
+        table = self.pa.Table.from_pydict(columns, schema=schema)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.part, schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def aggregate(files: list[str], output: str, elements: list[str] | None = None,
+    processes: int | None = None, chunksize: int = 64, batch_size: int = 10000,
+    progress: bool = True, cache: ParseCache | None = None
+) -> tuple[int, int, int]:
+    """
+    Summarise .res files across a process pool into output (a .csv file,
+    or a Parquet dataset directory for .parquet), writing every batch_size
+    rows so that memory stays bounded. An existing output is continued and
+    the files already in it are skipped.
+
+    The per-element columns start from those of elements, of the existing
+    output, or of the first structure summarised, and are widened as
+    structures with other elements come (a variable-composition search).
+    Files that failed before are tried again. With a ParseCache, files that
+    have not changed since they were summarised are not read again.
+
+    Returns the number of files summarised, failed and skipped.
+    """
+    if output.endswith('.parquet') or output.endswith('.pq'):
+        sink = ParquetMagSink(output, mag_columns(elements) if elements else None)
+    else:
+        sink = CsvMagSink(output, mag_columns(elements) if elements else None)
+
+    todo = [path for path in files if path not in sink.done]
+    nskipped = len(files) - len(todo)
+    nerrors = 0
+    ndone = 0
+    rows = []
+
+    def flush():
+        if rows:
+            sink.write(rows)
+            rows.clear()
+
+    def add(record):
+        nonlocal nerrors, ndone
+        if record['error'] is None:
+            if sink.columns is None:
+                sink.open(mag_columns(_elements(record)))
+            extra = [e for e in _elements(record) if f"spin_{e}" not in sink.columns]
+            if extra:
+                sink.widen(sink.columns + mag_columns(extra)[len(MAG_COLUMNS):])
+        if record['error'] is not None:
+            nerrors += 1
+        rows.append(record)
+        ndone += 1
+
+        if sink.columns is not None:
+            sink.open(sink.columns)
+            if len(rows) >= batch_size:
+                flush()
+        if progress:
+            print(f"{ndone}/{len(todo)}", end="\r", file=sys.stderr, flush=True)
+
+    try:
+        paths = todo
+        if cache is not None:
+            paths = []
+            for path in todo:
+                record = cache.get(path, 'res')
+                if record is None:
+                    paths.append(path)
+                else:
+                    add(dict(record, file=path, error=None))
+
+        with Pool(processes=processes) as pool:
+            for identity, record in pool.imap_unordered(_summarise_new, paths, chunksize=chunksize):
+                if cache is not None and identity is not None and record['error'] is None:
+                    summary = {k: v for k, v in record.items() if k not in ('file', 'error')}
+                    cache.put(record['file'], 'res', summary, identity=identity)
+                add(record)
+
+        if sink.columns is None:
+            sink.open(MAG_COLUMNS)
+        flush()
+    finally:
+        sink.close()
+
+    if progress:
+        print(file=sys.stderr)
+
+    return len(todo), nerrors, nskipped
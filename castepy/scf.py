@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+
+import math
+import numpy as np
+
+from .castep import BANNER
+
+
+class ScfParser:
+    """
+    Line-driven parser of the '<-- SCF' lines of a .castep file.
+
+    Every SCF loop (one per single point / geometry step) is kept as a list
+    of cycles (cycle, energy, fermi, gain, time); the 'Initial' row is
+    cycle 0 and has no energy gain. The Fermi energy column is only there
+    for metallic runs, which is taken from the header of the loop.
+    """
+
+    def __init__(self):
+        self.cycles = []
+        self.loop = None
+        self.nloop = -1
+        self.nrun = -1
+        self.step = 0
+        self.has_fermi = True
+
+    def feed(self, line: str):
+        if '<-- SCF' not in line:
+            if BANNER in line:
+                self.close()
+                self.nrun += 1
+                self.step = 0
+            elif ' iteration ' in line:
+                tokens = line.split()
+                if len(tokens) > 3 and tokens[0].endswith(':') and tokens[2] == 'iteration':
+                    self.step = int(tokens[3])
+            return
+
+        tokens = line.split('<--', 1)[0].split()
+        if not tokens or tokens[0].startswith('-'):
+            # horizontal rule: closes the loop after its last cycle
+            if self.loop:
+                self.close()
+            return
+
+        if tokens[0] == 'SCF':
+            self.close()
+            self.loop = []
+            self.has_fermi = 'Fermi' in tokens
+            return
+
+        if self.loop is None:
+            return
+
+        try:
+            cycle = 0 if tokens[0] == 'Initial' else int(tokens[0])
+            energy = float(tokens[1])
+            time = float(tokens[-1])
+        except (ValueError, IndexError):
+            return
+
+        fermi = math.nan
+        gain = math.nan
+        values = tokens[2:-1]
+        if self.has_fermi and values:
+            fermi = float(values.pop(0))
+        if cycle > 0 and values:
+            gain = float(values[0])
+
+        self.loop.append((cycle, energy, fermi, gain, time))
+
+    def close(self):
+        if self.loop:
+            self.nloop += 1
+            for cycle in self.loop:
+                self.cycles.append((max(self.nrun, 0), self.nloop, self.step) + cycle)
+        self.loop = None
+
+
+SCF_DTYPE = np.dtype([
+    ('run', 'i8'), ('loop', 'i8'), ('step', 'i8'), ('cycle', 'i8'),
+    ('energy', 'f8'), ('fermi', 'f8'), ('gain', 'f8'), ('time', 'f8')
+])
+
+
+class Scf:
+    """
+    Every SCF cycle of a .castep file as a NumPy structured array
+
+        run:    run of a concatenated file
+        loop:   SCF loop (0, 1, ...), i.e. one per energy evaluation
+        step:   geometry optimisation iteration the loop belongs to
+        cycle:  SCF cycle within the loop (0 is the 'Initial' row)
+        energy: total energy (eV)
+        fermi:  Fermi energy (eV), NaN for non-metallic runs
+        gain:   energy gain per atom (eV), NaN for the 'Initial' row
+        time:   wall time (s) since the start of the run
+    """
+
+    def __init__(self, data: np.ndarray):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    @ classmethod
+    def from_file(cls, filename: str):
+        parser = ScfParser()
+        with open(filename, 'r', errors='replace') as f:
+            for line in f:
+                parser.feed(line)
+        parser.close()
+        return cls(np.array(parser.cycles, dtype=SCF_DTYPE))
+
+    @ classmethod
+    def from_seed(cls, seed: str):
+        return cls.from_file(f"{seed}.castep")
+
+    def loops(self):
+        """
+        Yield the cycles of each SCF loop
+        """
+        if len(self.data) == 0:
+            return
+        bounds = np.flatnonzero(np.diff(self.data['loop'])) + 1
+        yield from np.split(self.data, bounds)
+
+    @ staticmethod
+    def seconds_per_cycle(loop: np.ndarray) -> float:
+        """
+        Mean wall time of an SCF cycle of one loop
+        """
+        if len(loop) < 2:
+            return math.nan
+        return float((loop['time'][-1] - loop['time'][0]) / (len(loop) - 1))
+
+    @ staticmethod
+    def convergence_rate(loop: np.ndarray) -> float:
+        """
+        Slope of log10|energy gain per atom| over the cycles of one loop, i.e.
+        decades gained per SCF cycle: strongly negative for fast mixing, close
+        to zero (or positive) for slow or sloshing charge mixing
+        """
+        gain = np.abs(loop['gain'])
+        mask = np.isfinite(gain) & (gain > 0)
+        if np.count_nonzero(mask) < 2:
+            return math.nan
+        return float(np.polyfit(loop['cycle'][mask], np.log10(gain[mask]), 1)[0])
+
+    def summary(self) -> list[dict]:
+        """
+        One record per SCF loop
+        """
+        return [
+            {
+                'run': int(loop['run'][0]),
+                'loop': int(loop['loop'][0]),
+                'step': int(loop['step'][0]),
+                'ncycles': int(loop['cycle'][-1]),
+                'energy': float(loop['energy'][-1]),
+                'seconds_per_cycle': self.seconds_per_cycle(loop),
+                'convergence_rate': self.convergence_rate(loop),
+            }
+            for loop in self.loops()
+        ]
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+
+import os
+import sqlite3
+import numpy as np
+
+from .res import Res
+from .resindex import reduced_formula, update_files
+
+
+# pair distances in units of (V/N)^(1/3) up to RMAX, smeared over NBINS bins
+RMAX = 3.0
+NBINS = 40
+SIGMA = 0.04
+
+
+def pair_distances(lattice: np.ndarray, positions: np.ndarray, rmax: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Distances (and the atoms i, j) of all pairs up to rmax in a periodic
+    cell (lattice vectors in rows, fractional positions): every periodic
+    image of every atom j around each atom i, so each pair both ways
+    """
+    # images needed along each axis: rmax over the spacing of the lattice planes
+    spacing = 1.0 / np.linalg.norm(np.linalg.inv(lattice), axis=0)
+    n = np.ceil(rmax / spacing).astype(int)
+    images = np.stack(np.meshgrid(*[np.arange(-k, k + 1) for k in n], indexing='ij'), -1).reshape(-1, 3)
+
+    positions = positions - np.floor(positions)
+    ii, jj, dd = [], [], []
+    for i in range(len(positions)):
+        delta = positions - positions[i]
+        vectors = (delta[:, None, :] + images[None, :, :]) @ lattice
+        d = np.linalg.norm(vectors, axis=-1)
+        # the atom itself (j == i, no translation) is not a pair
+        d[i, len(images) // 2] = np.inf
+        j, _ = np.nonzero(d <= rmax)
+        ii.append(np.full(len(j), i))
+        jj.append(j)
+        dd.append(d[d <= rmax])
+    return np.concatenate(ii), np.concatenate(jj), np.concatenate(dd)
+
+
+def fingerprint(lattice: np.ndarray, positions: np.ndarray, species, rmax: float = RMAX,
+    nbins: int = NBINS, sigma: float = SIGMA
+) -> np.ndarray:
+    """
+    Pair-distance histograms of each pair of elements (in alphabetical
+    order), per atom and Gaussian smeared, concatenated. Distances are in
+    units of (V/N)^(1/3) so that the fingerprint does not depend on the
+    volume, nor on the cell setting or the order of the atoms.
+    """
+    species = np.asarray(species, dtype=str)
+    elements, kinds = np.unique(species, return_inverse=True)
+    natoms = len(species)
+    scale = (abs(np.linalg.det(lattice)) / natoms) ** (1 / 3)
+
+    i, j, d = pair_distances(lattice, positions, rmax * scale)
+    d = d / scale
+    a = np.minimum(kinds[i], kinds[j])
+    b = np.maximum(kinds[i], kinds[j])
+    pair = a * len(elements) - a * (a - 1) // 2 + (b - a)
+
+    centres = (np.arange(nbins) + 0.5) * rmax / nbins
+    weights = np.exp(-0.5 * ((d[:, None] - centres[None, :]) / sigma) ** 2)
+    npairs = len(elements) * (len(elements) + 1) // 2
+    histogram = np.zeros((npairs, nbins))
+    np.add.at(histogram, pair, weights)
+    return (histogram / natoms).ravel()
+
+
+def res_fingerprint(res: Res, **kwargs) -> np.ndarray:
+    return fingerprint(res.lattice, res.positions, res.species, **kwargs)
+
+
+def distance(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Normalised L1 distance between fingerprints: 0 for the same structure,
+    1 for no overlap at all; b may be a stack of fingerprints
+    """
+    return np.abs(b - a).sum(axis=-1) / (np.abs(a).sum() + np.abs(b).sum(axis=-1))
+
+
+def volume_per_atom(res: Res) -> float:
+    return float(abs(np.linalg.det(res.lattice)) / len(res.species))
+
+
+def fingerprint_row(path: str) -> tuple:
+    """
+    (path, seed, formula, volume per atom, fingerprint) of a .res file, None
+    but the path if it cannot be parsed
+    """
+    try:
+        res = Res.from_file(path)
+        vector = res_fingerprint(res)
+    except (OSError, ValueError, IndexError):
+        return (path, None, None, None, None)
+    counts = dict(zip(*np.unique(res.species, return_counts=True)))
+    return (
+        path, res.seed, reduced_formula(counts), volume_per_atom(res),
+        vector.astype(np.float32).tobytes()
+    )
+
+
+class FingerprintIndex:
+    """
+    SQLite store of the fingerprints of .res files (by default
+    .castepy/fingerprint.sqlite in the directory), looked up by composition
+    and volume per atom, so that find() only compares the fingerprints of
+    structures of similar density. update() only fingerprints files that
+    are new or whose size or mtime changed, and drops files that are gone.
+    """
+
+    def __init__(self, filename: str):
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        self.db = sqlite3.connect(filename, timeout=60)
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(fingerprint)")]
+        if columns and 'volume_per_atom' not in columns:
+            # index written before volumes were stored: fingerprint again
+            self.db.execute("DROP TABLE fingerprint")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS fingerprint (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                seed TEXT,
+                formula TEXT,
+                volume_per_atom REAL,
+                vector BLOB
+            );
+            DROP INDEX IF EXISTS fingerprint_formula;
+            CREATE INDEX IF NOT EXISTS fingerprint_volume ON fingerprint (formula, volume_per_atom);
+        """)
+
+    @ classmethod
+    def for_directory(cls, directory: str):
+        return cls(os.path.join(directory, '.castepy', 'fingerprint.sqlite'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def update(self, directory: str, processes: int | None = 1, chunksize: int = 16,
+        quick: bool = False
+    ) -> tuple[int, int]:
+        """
+        Fingerprint the .res files of a directory (see
+        resindex.update_files()); returns the number of files (re)indexed
+        and the number of files removed from the index
+        """
+        return update_files(self.db, 'fingerprint', directory, fingerprint_row, processes, chunksize, quick)
+
+    def find(self, res: Res, tolerance: float = 0.05, exclude: str | None = None,
+        volume: float | None = 0.05
+    ) -> list[tuple[str, str, float]]:
+        """
+        Indexed structures of the same composition as res within tolerance
+        (fingerprint distance), closest first, as (path, seed, distance);
+        structures with the seed exclude are left out. Only structures whose
+        volume per atom is within the fraction volume of that of res are
+        compared (None: all of them).
+        """
+        counts = dict(zip(*np.unique(res.species, return_counts=True)))
+        query = "SELECT path, seed, vector FROM fingerprint WHERE formula = ?"
+        values = (reduced_formula(counts),)
+        if volume is not None:
+            v = volume_per_atom(res)
+            query += " AND volume_per_atom BETWEEN ? AND ?"
+            values += (v * (1 - volume), v * (1 + volume))
+        rows = self.db.execute(query, values).fetchall()
+        rows = [row for row in rows if row[1] != exclude]
+        if not rows:
+            return []
+
+        vectors = np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+        d = distance(res_fingerprint(res), vectors)
+        order = np.argsort(d)
+        return [(rows[k][0], rows[k][1], float(d[k])) for k in order if d[k] <= tolerance]
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import hashlib
+import datetime
+from dataclasses import dataclass
+
+
+STORE_DIR = '.castepy'
+CHUNK_SIZE = 1 << 20
+
+
+def file_hash(filename: str) -> str:
+    """
+    BLAKE2b (128 bit) of a file, read in chunks
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(filename, 'rb', buffering=0) as f:
+        while n := f.readinto(buffer):
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
+def find_root(path: str = '.') -> str:
+    """
+    Nearest directory from path upwards holding a .castepy store, or the
+    directory of path itself if there is none yet
+    """
+    path = os.path.abspath(path)
+    start = path if os.path.isdir(path) else os.path.dirname(path)
+    directory = start
+    while True:
+        if os.path.isdir(os.path.join(directory, STORE_DIR)):
+            return directory
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return start
+        directory = parent
+
+
+def _reflink(src: str, dst: str) -> bool:
+    """
+    Copy-on-write clone of src (Linux FICLONE: btrfs, XFS, ...), False where
+    the filesystem does not support it
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    FICLONE = 0x40049409
+    with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+        try:
+            fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+            return True
+        except OSError:
+            pass
+    os.unlink(dst)
+    return False
+
+
+@dataclass
+class Snapshot:
+    timestamp: str
+    path: str
+    hash: str
+
+
+class SnapshotStore:
+    """
+    Content-addressed store of input files in <root>/.castepy/snapshots
+
+    Each distinct content is kept once as objects/<hash[:2]>/<hash[2:]>
+    (read-only) and manifest.tsv lists every snapshot as timestamp, path
+    relative to root and hash.
+
+    Objects are reflinked where the filesystem allows it and copied
+    otherwise. link=True hard links them to the inputs instead, which is
+    only safe as long as inputs are replaced by rename (as Cell.to_file and
+    Param.to_file do) and never edited in place.
+    """
+
+    def __init__(self, root: str | None = None, link: bool = False):
+        self.root = os.path.abspath(root) if root else find_root()
+        self.directory = os.path.join(self.root, STORE_DIR, 'snapshots')
+        self.manifest = os.path.join(self.directory, 'manifest.tsv')
+        self.link = link
+
+    @ classmethod
+    def for_file(cls, filename: str, link: bool = False):
+        return cls(find_root(filename), link=link)
+
+    def object_path(self, hash: str) -> str:
+        return os.path.join(self.directory, 'objects', hash[:2], hash[2:])
+
+    def _store(self, filename: str, hash: str):
+        target = self.object_path(hash)
+        if os.path.exists(target):
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp = f"{target}.{os.getpid()}.tmp"
+        if self.link:
+            try:
+                os.link(filename, target)
+                return
+            except FileExistsError:
+                return
+            except OSError:
+                pass
+        if not _reflink(filename, temp):
+            shutil.copyfile(filename, temp)
+        os.chmod(temp, 0o444)
+        os.replace(temp, target)
+
+    def save(self, filenames: list[str]) -> list[str]:
+        """
+        Snapshot files and return their hashes
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        timestamp = datetime.datetime.now().isoformat(timespec='seconds')
+        hashes = []
+        lines = []
+        for filename in filenames:
+            hash = file_hash(filename)
+            self._store(filename, hash)
+            hashes.append(hash)
+            lines.append(f"{timestamp}\t{os.path.relpath(os.path.abspath(filename), self.root)}\t{hash}\n")
+
+        with open(self.manifest, 'a') as f:
+            f.write("".join(lines))
+        return hashes
+
+    def history(self, filename: str | None = None) -> list[Snapshot]:
+        """
+        Snapshots in the order they were taken, of one file or of all
+        """
+        if not os.path.isfile(self.manifest):
+            return []
+        path = None if filename is None else os.path.relpath(os.path.abspath(filename), self.root)
+        with open(self.manifest, 'r') as f:
+            snapshots = [Snapshot(*line.rstrip('\n').split('\t')) for line in f if line.strip()]
+        return [s for s in snapshots if path is None or s.path == path]
+
+    def find(self, filename: str, hash: str | None = None) -> Snapshot:
+        """
+        Latest snapshot of filename, or the one whose hash starts with hash
+        """
+        snapshots = [
+            s for s in self.history(filename)
+            if hash is None or s.hash.startswith(hash)
+        ]
+        if not snapshots:
+            raise FileNotFoundError(f"no snapshot of {filename}" + (f" matching {hash}" if hash else ""))
+        return snapshots[-1]
+
+    def restore(self, filename: str, hash: str | None = None, output: str | None = None) -> str:
+        """
+        Write a snapshot of filename back to filename (or to output)
+        through a temporary file and an atomic rename
+        """
+        snapshot = self.find(filename, hash)
+        output = output or filename
+        directory, basename = os.path.split(os.path.abspath(output))
+        temp = os.path.join(directory, f".{basename}.{os.getpid()}.tmp")
+        shutil.copyfile(self.object_path(snapshot.hash), temp)
+        os.replace(temp, output)
+        return snapshot.hash
+
+
+def snapshot(filenames: list[str], link: bool = False) -> list[str]:
+    """
+    Snapshot files into the store of the project of the first file
+    """
+    if not filenames:
+        return []
+    return SnapshotStore.for_file(filenames[0], link=link).save(filenames)
@@ -0,0 +1,522 @@
+#!/usr/bin/env python
+
+import os
+import glob
+import math
+import shutil
+import threading
+import subprocess
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from .castep import CastepParser, read_kpoints_mp_spacing
+from .cache import ParseCache
+from .cell import Cell
+from .param import Param
+from .files import set_keyword, write_atomic
+
+
+# columns of castep-conv.csv, as written by castep-wf-conv
+CONV_CSV_COLUMNS = [
+    'cutoff_energy(eV)', 'grid_scale', 'fine_grid_scale', 'kpoint_spacing(A-1)',
+    'energy(eV/atom)', 'time(s)'
+]
+
+# sweep keywords and the format of their values (in directory names)
+SWEEP_FORMATS = {
+    'cut_off_energy': '{:.0f}',
+    'fine_grid_scale': '{:.1f}',
+    'kpoints_mp_spacing': '{:.3f}',
+}
+
+
+# castep-conv.csv column of each sweep keyword
+KEYWORD_COLUMNS = {
+    'cut_off_energy': 'cutoff_energy(eV)',
+    'fine_grid_scale': 'fine_grid_scale',
+    'kpoints_mp_spacing': 'kpoint_spacing(A-1)',
+}
+
+
+def sweep_values(keyword: str, first: float, last: float, increment: float) -> list[str]:
+    """
+    Values from first to last (included) in steps of increment, formatted
+    for the keyword as 'seq -f' does in castep-wf-conv
+    """
+    fmt = SWEEP_FORMATS[keyword.lower()]
+    n = int((last - first) / increment + 1e-9) + 1
+    return [fmt.format(first + i * increment) for i in range(max(n, 0))]
+
+
+def mp_grids(seed: str, values: list[str]) -> dict[str, tuple[int, int, int]]:
+    """
+    Monkhorst-Pack grid of each k-point spacing of values for the lattice
+    of {seed}.cell
+    """
+    cell = Cell.from_file(f"{seed}.cell")
+    return {value: cell.kpoints_mp_grid(float(value)) for value in values}
+
+
+def same_values(seed: str, keyword: str, values: list[str]) -> dict[str, str]:
+    """
+    Values that give the same run as an earlier one (k-point spacings with
+    the same Monkhorst-Pack grid), mapped to that one
+    """
+    same, first = {}, {}
+    if keyword.lower() == 'kpoints_mp_spacing':
+        for value, grid in mp_grids(seed, values).items():
+            if grid in first:
+                same[value] = first[grid]
+            else:
+                first[grid] = value
+    return same
+
+
+def current_settings(seed: str) -> dict[str, str]:
+    """
+    Cut-off, grid scale, fine grid scale and k-point spacing of the inputs
+    of a seed, formatted for the directory name of a run
+    """
+    param = Param.from_file(f"{seed}.param").param
+    kpn = read_kpoints_mp_spacing(f"{seed}.cell")
+    gs = float(param.get('grid_scale', 1.75))
+    return {
+        'cut': f"{float(param['cut_off_energy']):.0f}" if 'cut_off_energy' in param else '',
+        'gs': f"{gs:.2f}",
+        'fgs': f"{float(param.get('fine_grid_scale', gs)):.2f}",
+        'kpn': f"{kpn:.3f}" if kpn is not None else '',
+    }
+
+
+def run_directory(settings: dict[str, str]) -> str:
+    return "cut{cut}_gs{gs}_fgs{fgs}_kpn{kpn}".format(**settings)
+
+
+def set_value(seed: str, keyword: str, value: str):
+    """
+    Set a sweep keyword of a seed: cut_off_energy and fine_grid_scale in
+    the .param, kpoints_mp_spacing in the .cell. Only the line of the
+    keyword is changed (as sed did in castep-wf-conv), the rest of the
+    file is left as it is.
+    """
+    keyword = keyword.lower()
+    if keyword == 'kpoints_mp_spacing':
+        set_keyword(f"{seed}.cell", keyword, value)
+    else:
+        set_keyword(f"{seed}.param", keyword, value)
+
+
+SETTING_NAMES = {'cut_off_energy': 'cut', 'fine_grid_scale': 'fgs', 'kpoints_mp_spacing': 'kpn'}
+
+
+def prepare_run(seed: str, settings: dict[str, str], changes: dict[str, str]) -> tuple[str, bool]:
+    """
+    Directory of the run with the keywords of changes set to their values
+    (inputs and pseudopotentials copied in, the values set with
+    set_value()); returns it and whether it is new. An existing directory is
+    left alone.
+    """
+    changes = {keyword.lower(): value for keyword, value in changes.items()}
+    settings = dict(settings)
+    for keyword, value in changes.items():
+        settings[SETTING_NAMES[keyword]] = value
+    directory = run_directory(settings)
+    if os.path.isdir(directory):
+        return directory, False
+
+    # build in a temporary directory, so that an interrupted copy is not
+    # taken for a run later
+    temp = f".{directory}.{os.getpid()}.tmp"
+    os.makedirs(temp, exist_ok=True)
+    for filename in [f"{seed}.cell", f"{seed}.param"] + glob.glob('*.usp*') + glob.glob('*pot*'):
+        if os.path.isfile(filename):
+            shutil.copy(filename, temp)
+
+    for keyword, value in changes.items():
+        set_value(os.path.join(temp, seed), keyword, value)
+
+    os.rename(temp, directory)
+    return directory, True
+
+
+def read_result(directory: str, seed: str, cache: bool = True) -> dict | None:
+    """
+    Row of castep-conv.csv for the run in directory, None if it has no
+    final energy. Rows of runs whose .castep has not changed since are
+    taken from the parse cache ('conv' records) unless cache is False.
+    """
+    filename = os.path.join(directory, f"{seed}.castep")
+    if not os.path.exists(filename):
+        return None
+    if not cache:
+        return _read_result(filename)
+
+    # a connection per call, as the rows are read from the worker threads
+    with ParseCache() as parse_cache:
+        return parse_cache.cached(filename, 'conv', _read_result)
+
+
+def _read_result(filename: str) -> dict | None:
+    parser = CastepParser()
+    energy = time = None
+    forces, in_forces = [], False
+    with open(filename, 'r', errors='replace') as f:
+        for line in f:
+            parser.feed(line)
+            temp = line.strip()
+            if temp.startswith('Final energy'):
+                # 'Final energy, E = x eV' (metals) or 'Final energy = x eV'
+                energy = float(temp.split('=', 1)[1].split()[0])
+            elif temp.startswith('Total time'):
+                time = float(temp.split('=', 1)[1].split()[0])
+            elif temp.startswith('*') and ' Forces ' in temp:
+                forces, in_forces = [], True
+            elif in_forces:
+                # '*  Ni    1    0.00000    0.00000    0.00000   *' rows
+                tokens = temp.strip('* ').split()
+                if len(tokens) >= 5 and tokens[1].isdigit():
+                    forces.append(math.hypot(*map(float, tokens[2:5])))
+                elif temp.startswith('*****') and forces:
+                    in_forces = False
+    parser.close()
+
+    run = parser.runs[-1] if parser.runs else None
+    if run is None or energy is None or not run.nions:
+        return None
+    kpn = read_kpoints_mp_spacing(filename[:-len('.castep')] + '.cell')
+    return {
+        'cutoff_energy(eV)': run.cut_off_energy,
+        'grid_scale': run.grid_scale,
+        'fine_grid_scale': run.fine_grid_scale if run.fine_grid_scale is not None else run.grid_scale,
+        'kpoint_spacing(A-1)': kpn,
+        'energy(eV/atom)': energy / run.nions,
+        'time(s)': time,
+        'pressure': run.pressure,
+        'max_force': max(forces) if forces else None,
+    }
+
+
+def partition_cores(nworkers: int, cores: list[int] | None = None) -> list[list[int]]:
+    """
+    Split the cores available to this process (or cores) into nworkers
+    contiguous, nearly equal subsets
+    """
+    if cores is None:
+        cores = sorted(os.sched_getaffinity(0))
+    nworkers = max(1, min(nworkers, len(cores)))
+    size, extra = divmod(len(cores), nworkers)
+    subsets, start = [], 0
+    for i in range(nworkers):
+        end = start + size + (i < extra)
+        subsets.append(cores[start:end])
+        start = end
+    return subsets
+
+
+class ShellExecutor:
+    """
+    Run CASTEP in a directory through the shell. The command is a template
+    with {seed}, {ncores} and {cores} (comma-separated core ids), by default
+    pinning an MPI run to the cores of its worker with taskset; any callable
+    executor(directory, seed, cores) can be used instead, e.g. a fake CASTEP
+    in tests.
+    """
+
+    def __init__(self, command: str = "taskset -c {cores} mpirun -n {ncores} castep.mpi {seed}"):
+        self.command = command
+
+    def __call__(self, directory: str, seed: str, cores: list[int]):
+        command = self.command.format(
+            seed=seed, ncores=len(cores), cores=",".join(str(core) for core in cores)
+        )
+        subprocess.run(command, shell=True, cwd=directory)
+
+
+class ConvTable:
+    """
+    castep-conv.csv (and its .tsv copy) appended to by concurrent runs. The
+    rows are kept sorted by cut-off, grid scales and k-point spacing, so
+    that the table (and its plots) do not follow the order the runs
+    finished in.
+    """
+
+    def __init__(self, filename: str = 'castep-conv.csv'):
+        self.filename = filename
+        self.lock = threading.Lock()
+        if not os.path.exists(filename):
+            with open(filename, 'w') as f:
+                f.write(",".join(CONV_CSV_COLUMNS) + "\n")
+
+    @ staticmethod
+    def _key(line: str) -> tuple:
+        # empty values first
+        values = line.split(',')[:4]
+        return tuple((1, float(value)) if value else (0, 0.0) for value in values)
+
+    def append(self, row: dict):
+        with self.lock:
+            with open(self.filename, 'r') as f:
+                lines = f.read().splitlines()
+            lines.append(",".join(
+                '' if row[name] is None else str(row[name]) for name in CONV_CSV_COLUMNS
+            ))
+            text = "\n".join(lines[:1] + sorted(filter(None, lines[1:]), key=self._key)) + "\n"
+            write_atomic(self.filename, text)
+            write_atomic(self.filename[:-len('.csv')] + '.tsv', text.replace(',', '\t'))
+
+
+def _clean(directory: str, seed: str):
+    for ext in ['.check', '.bands', '.castep_bin']:
+        path = os.path.join(directory, seed + ext)
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def run_points(seed: str, points: dict, nworkers: int = 1, executor=None,
+    cores: list[int] | None = None, output: str = 'castep-conv.csv', callback=None, stop=None,
+    same: dict | None = None
+) -> dict:
+    """
+    Run CASTEP for every point (key: {keyword: value, ...}) with nworkers
+    concurrent runs, each on its own subset of the cores. Runs whose
+    directory exists are not repeated, only read. Rows go to output as runs
+    finish, and callback(key, row) is called for each. Points are started in
+    order; once stop(rows) is true no more are started (those running
+    finish). Returns the rows by key (None for runs without a final energy).
+
+    Points of same (key: key of a point to run) are not run: they take the
+    row of that point, with their own values, when it finishes.
+    """
+    same = same or {}
+    copies = {}
+    for key, other in same.items():
+        copies.setdefault(other, []).append(key)
+
+    if executor is None:
+        executor = ShellExecutor()
+
+    # a single point energy, if the param has a task at all
+    if 'task' in Param.from_file(f"{seed}.param").param:
+        set_keyword(f"{seed}.param", 'task', 'singlepoint')
+
+    settings = current_settings(seed)
+    table = ConvTable(output)
+    subsets = partition_cores(nworkers, cores)
+
+    # each worker thread takes a core subset for as long as it lives
+    free = list(subsets)
+    free_lock = threading.Lock()
+    local = threading.local()
+
+    def run(changes):
+        if not hasattr(local, 'cores'):
+            with free_lock:
+                local.cores = free.pop()
+        directory, new = prepare_run(seed, settings, changes)
+        if new:
+            executor(directory, seed, local.cores)
+        row = read_result(directory, seed)
+        if row is not None:
+            table.append(row)
+        _clean(directory, seed)
+        return row
+
+    def copy(key, row):
+        if row is None:
+            return None
+        row = dict(row)
+        for keyword, value in points[key].items():
+            row[KEYWORD_COLUMNS[keyword.lower()]] = float(value)
+        table.append(row)
+        return row
+
+    rows = {}
+    todo = [key for key in points if key not in same]
+    with ThreadPoolExecutor(max_workers=len(subsets)) as pool:
+        running = {}
+        while todo or running:
+            # no more runs queued than there are workers, so that stopping
+            # leaves nothing behind
+            while todo and len(running) < len(subsets):
+                key = todo.pop(0)
+                running[pool.submit(run, points[key])] = key
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = running.pop(future)
+                rows[key] = future.result()
+                for other in copies.get(key, []):
+                    rows[other] = copy(other, rows[key])
+                if callback is not None:
+                    for other in [key] + copies.get(key, []):
+                        callback(other, rows[other])
+            if stop is not None and stop(rows):
+                todo = []
+    return {key: rows[key] for key in points if key in rows}
+
+
+def run_sweep(seed: str, keyword: str, values: list[str], **kwargs) -> dict[str, dict | None]:
+    """
+    run_points() of keyword over values; rows by value. A k-point spacing
+    giving the same Monkhorst-Pack grid as an earlier one is not run again,
+    it takes the row of that one.
+    """
+    same = same_values(seed, keyword, values)
+    return run_points(seed, {value: {keyword: value} for value in values}, same=same, **kwargs)
+
+
+def energy_converged(values: list[str], rows: dict[str, dict | None], tolerance: float = 1.0,
+    window: int = 2, stress: float | None = None, force: float | None = None
+) -> str | None:
+    """
+    First of values from which the energy per atom stays within tolerance
+    (meV/atom) over the next window values, and optionally the pressure
+    within stress (GPa) and the largest force within force (eV/A); None if
+    there is none yet. Only the values done without a gap from the first
+    one are looked at.
+    """
+    done = []
+    for value in values:
+        if rows.get(value) is None:
+            break
+        done.append(rows[value])
+
+    def spread(rows, key):
+        data = [row[key] for row in rows]
+        if any(x is None for x in data):
+            return math.inf
+        return max(data) - min(data)
+
+    for i in range(len(done) - window):
+        series = done[i:i + window + 1]
+        if spread(series, 'energy(eV/atom)') * 1000 > tolerance:
+            continue
+        if stress is not None and spread(series, 'pressure') > stress:
+            continue
+        if force is not None and spread(series, 'max_force') > force:
+            continue
+        return values[i]
+    return None
+
+
+def run_adaptive(seed: str, keyword: str, values: list[str], tolerance: float = 1.0, window: int = 2,
+    stress: float | None = None, force: float | None = None, write: bool = True, **kwargs
+) -> tuple[str | None, dict[str, dict | None]]:
+    """
+    run_sweep() that stops once energy_converged() finds a converged value,
+    which is then set in the inputs of the seed (if write); returns it
+    (None if the sweep ended first) and the rows. Values that repeat an
+    earlier run (same_values()) do not count towards the window.
+    """
+    same = same_values(seed, keyword, values)
+    distinct = [value for value in values if value not in same]
+
+    def stop(rows):
+        return energy_converged(distinct, rows, tolerance, window, stress, force) is not None
+
+    rows = run_sweep(seed, keyword, values, stop=stop, **kwargs)
+    value = energy_converged(distinct, rows, tolerance, window, stress, force)
+    if value is not None and write:
+        set_value(seed, keyword, value)
+    return value, rows
+
+
+def _split(i0: int, i1: int) -> list[int]:
+    return [i0, (i0 + i1) // 2, i1] if i1 - i0 > 1 else [i0, i1]
+
+
+def _pairs(indices: list[int]) -> list[tuple[int, int]]:
+    return list(zip(indices[:-1], indices[1:])) or [(indices[0], indices[0])]
+
+
+def _middle(i0: int, i1: int) -> list[int]:
+    # the middle of a side, or both ends if there is nothing in between
+    return [(i0 + i1) // 2] if i1 - i0 > 1 else sorted({i0, i1})
+
+
+def _bilinear(energy: np.ndarray, rectangle: tuple[int, int, int, int], i: int, j: int) -> float:
+    i0, i1, j0, j1 = rectangle
+    u = (i - i0) / (i1 - i0) if i1 > i0 else 0.0
+    v = (j - j0) / (j1 - j0) if j1 > j0 else 0.0
+    return (
+        (1 - u) * (1 - v) * energy[i0, j0] + (1 - u) * v * energy[i0, j1]
+        + u * (1 - v) * energy[i1, j0] + u * v * energy[i1, j1]
+    )
+
+
+def run_map(seed: str, keywords: tuple[str, str], values: tuple[list[str], list[str]],
+    tolerance: float = 1.0, coarse: int = 4, output_map: str | None = 'castep-conv-map.csv', **kwargs
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Adaptive 2D sweep of two keywords (e.g. cut_off_energy and
+    fine_grid_scale) over the grid of their values. Every coarse-th value
+    of each (and the last) is run first. The middle of each rectangle of
+    the grid is then run and compared with the bilinear interpolation of
+    its corners: a rectangle where they differ by more than tolerance
+    (meV/atom) is split in two along each axis, and its new corners and
+    the middles of the new rectangles are run, round by round, all runs of
+    a round concurrently (run_points() kwargs). The points not run are
+    bilinearly interpolated within the rectangle they end up in.
+
+    Returns the energy map (eV/atom, values[0] along the rows) and the
+    mask of the points run; the map is also written to output_map.
+    """
+    n0, n1 = len(values[0]), len(values[1])
+    energy = np.full((n0, n1), np.nan)
+    sampled = np.zeros((n0, n1), dtype=bool)
+
+    def run(indices):
+        points = {
+            (i, j): {keywords[0]: values[0][i], keywords[1]: values[1][j]}
+            for i, j in sorted(indices) if not sampled[i, j]
+        }
+        for (i, j), row in run_points(seed, points, **kwargs).items():
+            sampled[i, j] = True
+            if row is not None:
+                energy[i, j] = row['energy(eV/atom)']
+
+    def middles(rectangles):
+        return {(i, j) for i0, i1, j0, j1 in rectangles for i in _middle(i0, i1) for j in _middle(j0, j1)}
+
+    axes = [sorted(set(range(0, n, coarse)) | {n - 1}) for n in (n0, n1)]
+    rectangles = [(i0, i1, j0, j1) for i0, i1 in _pairs(axes[0]) for j0, j1 in _pairs(axes[1])]
+    run({(i, j) for i in axes[0] for j in axes[1]} | middles(rectangles))
+
+    leaves = []
+    while rectangles:
+        refined, points = [], set()
+        for rectangle in rectangles:
+            i0, i1, j0, j1 = rectangle
+            if i1 - i0 <= 1 and j1 - j0 <= 1:
+                leaves.append(rectangle)
+                continue
+            error = np.max([
+                abs(energy[i, j] - _bilinear(energy, rectangle, i, j))
+                for i in _middle(i0, i1) for j in _middle(j0, j1)
+            ])
+            # a failed run (nan) cannot tell either
+            if not error * 1000 > tolerance:
+                leaves.append(rectangle)
+                continue
+            rows, columns = _split(i0, i1), _split(j0, j1)
+            points.update((i, j) for i in rows for j in columns)
+            refined += [(a0, a1, b0, b1) for a0, a1 in _pairs(rows) for b0, b1 in _pairs(columns)]
+        run(points | middles(refined))
+        rectangles = refined
+
+    result = energy.copy()
+    for rectangle in leaves:
+        i0, i1, j0, j1 = rectangle
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                if not sampled[i, j]:
+                    result[i, j] = _bilinear(energy, rectangle, i, j)
+
+    if output_map is not None:
+        with open(output_map, 'w') as f:
+            columns = [KEYWORD_COLUMNS[keyword.lower()] for keyword in keywords]
+            f.write(",".join(columns + ['energy(eV/atom)', 'sampled']) + "\n")
+            for i in range(n0):
+                for j in range(n1):
+                    f.write(f"{values[0][i]},{values[1][j]},{result[i, j]},{int(sampled[i, j])}\n")
+
+    return result, sampled
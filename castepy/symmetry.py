@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+
+import os
+import sqlite3
+import hashlib
+import numpy as np
+from multiprocessing import Pool
+
+from .cell import Lattice
+from .res import Res
+
+
+# precision of the canonical form hashed for the cache
+HASH_DECIMALS = 5
+
+
+def structure_hash(res: Res) -> str:
+    """
+    Hash of a canonical form of a structure: lattice, and species, spins and
+    wrapped fractional positions sorted, all rounded to HASH_DECIMALS, so
+    that it does not depend on the order of the atoms
+    """
+    positions = np.round(res.positions - np.floor(res.positions), HASH_DECIMALS) % 1.0
+    spins = np.round(np.nan_to_num(res.spins, nan=0.0), 2) + 0.0
+    order = np.lexsort((positions[:, 2], positions[:, 1], positions[:, 0], spins, res.species))
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update((np.round(res.lattice, HASH_DECIMALS) + 0.0).tobytes())
+    h.update(" ".join(res.species[order]).encode())
+    h.update(spins[order].tobytes())
+    h.update(positions[order].tobytes())
+    return h.hexdigest()
+
+
+def _spglib():
+    try:
+        import spglib
+    except ImportError:
+        raise ImportError("symmetry analysis needs spglib (pip install spglib)") from None
+    return spglib
+
+
+def _field(dataset, name):
+    # attributes since spglib 2.5, a dict before
+    return getattr(dataset, name) if hasattr(dataset, name) else dataset[name]
+
+
+def _spg_cell(res: Res):
+    """
+    spglib cell of a Res with one type per element and spin, so that the
+    symmetry found is that of the magnetic configuration too
+    """
+    spins = np.round(np.nan_to_num(res.spins, nan=0.0), 2) + 0.0
+    kinds = list(dict.fromkeys(zip(res.species.tolist(), spins.tolist())))
+    numbers = [kinds.index(kind) for kind in zip(res.species.tolist(), spins.tolist())]
+    return (res.lattice, res.positions, numbers), kinds
+
+
+def analyse(res: Res, symprec: float = 0.1) -> dict:
+    """
+    Space group (number and international symbol) of a structure, and the
+    structure symmetrised to its primitive standardised cell; spins are kept
+    """
+    spglib = _spglib()
+    cell, kinds = _spg_cell(res)
+
+    dataset = spglib.get_symmetry_dataset(cell, symprec=symprec)
+    if dataset is None:
+        return {'number': None, 'international': None, 'structure': None}
+
+    lattice, positions, numbers = spglib.standardize_cell(
+        cell, to_primitive=True, no_idealize=False, symprec=symprec
+    )
+    species = np.array([kinds[n][0] for n in numbers], dtype=str)
+    structure = Res(
+        seed=res.seed,
+        pressure=res.pressure,
+        enthalpy=res.enthalpy,
+        volume=abs(float(np.linalg.det(lattice))),
+        nat=len(numbers),
+        sym=_field(dataset, 'international'),
+        abc=_abc(lattice),
+        species=species,
+        positions=np.array(positions, dtype=float),
+        occupancy=np.ones(len(numbers)),
+        spins=np.array([kinds[n][1] for n in numbers], dtype=float),
+    )
+    return {
+        'number': int(_field(dataset, 'number')),
+        'international': str(_field(dataset, 'international')),
+        'structure': structure,
+    }
+
+
+def _abc(lattice: np.ndarray) -> np.ndarray:
+    return np.concatenate(Lattice(np.array(lattice, dtype=float)).abc())
+
+
+def _analyse(args):
+    res, symprec = args
+    return analyse(res, symprec)
+
+
+class SymmetryCache:
+    """
+    Results of analyse() by structure_hash() and symprec, kept in memory and
+    (unless filename is None) in SQLite, by default
+    .castepy/symmetry.sqlite in the directory
+    """
+
+    def __init__(self, filename: str | None = None):
+        self.memory = {}
+        self.db = None
+        if filename is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+            self.db = sqlite3.connect(filename, timeout=60)
+            self.db.executescript("""
+                CREATE TABLE IF NOT EXISTS symmetry (
+                    hash TEXT NOT NULL,
+                    symprec REAL NOT NULL,
+                    number INTEGER,
+                    international TEXT,
+                    lattice BLOB,
+                    species TEXT,
+                    positions BLOB,
+                    spins BLOB,
+                    PRIMARY KEY (hash, symprec)
+                );
+            """)
+
+    @ classmethod
+    def for_directory(cls, directory: str):
+        return cls(os.path.join(directory, '.castepy', 'symmetry.sqlite'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.db is not None:
+            self.db.commit()
+            self.db.close()
+
+    def get(self, key: str, symprec: float) -> dict | None:
+        if (key, symprec) in self.memory:
+            return self.memory[key, symprec]
+        if self.db is None:
+            return None
+        row = self.db.execute(
+            "SELECT number, international, lattice, species, positions, spins FROM symmetry "
+            "WHERE hash = ? AND symprec = ?", (key, symprec)
+        ).fetchone()
+        if row is None:
+            return None
+
+        number, international, lattice, species, positions, spins = row
+        structure = None
+        if lattice is not None:
+            lattice = np.frombuffer(lattice).reshape(3, 3)
+            species = np.array(species.split(), dtype=str)
+            structure = Res(
+                seed='', volume=abs(float(np.linalg.det(lattice))), nat=len(species),
+                sym=international, abc=_abc(lattice), species=species,
+                positions=np.frombuffer(positions).reshape(-1, 3).copy(),
+                occupancy=np.ones(len(species)), spins=np.frombuffer(spins).copy(),
+            )
+        result = {'number': number, 'international': international, 'structure': structure}
+        self.memory[key, symprec] = result
+        return result
+
+    def put(self, key: str, symprec: float, result: dict):
+        self.memory[key, symprec] = result
+        if self.db is None:
+            return
+        structure = result['structure']
+        if structure is None:
+            values = (None, None, None, None)
+        else:
+            values = (
+                structure.lattice.tobytes(), " ".join(structure.species),
+                structure.positions.tobytes(), structure.spins.astype(float).tobytes()
+            )
+        self.db.execute(
+            "INSERT OR REPLACE INTO symmetry VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, symprec, result['number'], result['international']) + values
+        )
+
+    def analyse(self, structures: list[Res], symprec: float = 0.1, processes: int | None = 1,
+        chunksize: int = 16
+    ) -> list[dict]:
+        """
+        analyse() of many structures, in a process pool for those not in
+        the cache; the results are in the order of structures
+        """
+        keys = [structure_hash(res) for res in structures]
+        results = [self.get(key, symprec) for key in keys]
+
+        todo = {}
+        for i, (key, result) in enumerate(zip(keys, results)):
+            if result is None:
+                todo.setdefault(key, []).append(i)
+
+        jobs = [(structures[indices[0]], symprec) for indices in todo.values()]
+        if processes == 1 or len(jobs) < 2:
+            computed = map(_analyse, jobs)
+        else:
+            with Pool(processes=processes) as pool:
+                computed = pool.map(_analyse, jobs, chunksize=chunksize)
+
+        for (key, indices), result in zip(todo.items(), computed):
+            self.put(key, symprec, result)
+            for i in indices:
+                results[i] = result
+        if self.db is not None:
+            self.db.commit()
+
+        # the structures are shared by the cache, each caller gets a copy
+        return [
+            dict(result, structure=_renamed(result['structure'], res.seed))
+            for res, result in zip(structures, results)
+        ]
+
+
+def _renamed(structure: Res | None, seed: str) -> Res | None:
+    if structure is None:
+        return None
+    return Res(
+        seed=seed, volume=structure.volume, nat=structure.nat, sym=structure.sym,
+        abc=structure.abc.copy(), species=structure.species.copy(),
+        positions=structure.positions.copy(), occupancy=structure.occupancy.copy(),
+        spins=structure.spins.copy(),
+    )
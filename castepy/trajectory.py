@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+import os
+import numpy as np
+
+from .castep import ConvParser, CONV_COLUMNS
+
+
+TRAJECTORY_DTYPE = np.dtype(
+    [('step', 'U32')] + [(name, 'f8') for name in CONV_COLUMNS[1:]]
+)
+
+
+class Trajectory:
+    """
+    Geometry optimisation trajectory of a .castep file as a NumPy structured
+    array with one record per optimiser step:
+
+        step, a, b, c, alpha, beta, gamma, volume, density, spin, energy
+
+    Missing quantities (e.g. spin of a spin-unpolarised run) are NaN.
+    """
+
+    def __init__(self, data: np.ndarray):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    @ classmethod
+    def from_rows(cls, rows: list[dict]):
+        data = np.empty(len(rows), dtype=TRAJECTORY_DTYPE)
+        for name in TRAJECTORY_DTYPE.names:
+            data[name] = [row[name] for row in rows]
+        return cls(data)
+
+    @ classmethod
+    def from_file(cls, filename: str):
+        """
+        Read all optimiser steps of a (concatenated) .castep file in one pass
+        """
+        parser = ConvParser()
+        with open(filename, 'r', errors='replace') as f:
+            for line in f:
+                parser.feed(line)
+        parser.close()
+        return cls.from_rows(parser.rows)
+
+    @ classmethod
+    def from_seed(cls, seed: str):
+        return cls.from_file(f"{seed}.castep")
+
+    def as_dict(self) -> dict[str, np.ndarray]:
+        """
+        Columns as contiguous arrays
+        """
+        return {
+            name: np.ascontiguousarray(self.data[name])
+            for name in TRAJECTORY_DTYPE.names
+        }
+
+    def to_csv(self, filename: str):
+        with open(filename, 'w') as f:
+            f.write(",".join(TRAJECTORY_DTYPE.names) + "\n")
+            for record in self.data:
+                f.write(",".join(str(value) for value in record.tolist()) + "\n")
+
+    def to_npz(self, filename: str):
+        np.savez(filename, **self.as_dict())
+
+    def to_parquet(self, filename: str):
+        # needs pandas with pyarrow or fastparquet
+        import pandas as pd
+        pd.DataFrame(self.as_dict()).to_parquet(filename, index=False)
+
+    def to_file(self, filename: str):
+        """
+        Export by extension: .csv, .npz or .parquet
+        """
+        ext = os.path.splitext(filename)[1].lower()
+        if ext == '.csv':
+            self.to_csv(filename)
+        elif ext == '.npz':
+            self.to_npz(filename)
+        elif ext in ['.parquet', '.pq']:
+            self.to_parquet(filename)
+        else:
+            raise ValueError(f"{ext} is not supported")
+
+
+def read_trajectory(filename: str) -> Trajectory:
+    return Trajectory.from_file(filename)
@@ -0,0 +1,35 @@
+import os
+import numpy as np
+import pytest
+
+from castepy.mulliken import Mulliken, mulliken_row
+
+
+DATA = os.path.join(os.path.dirname(__file__), 'data')
+
+
+@pytest.mark.parametrize('filename', [
+    'mulliken-charge-e-spin.castep',        # Total  Charge (e)  Spin (hbar/2), one row per ion
+    'mulliken-charge-spin-up-dn.castep',    # Total  Charge(e)   Spin(hbar/2), up:/dn: rows
+    'mulliken-charge-spin-f.castep',        # Total   Charge(e)   Spin(hbar/2), with f
+])
+def test_polarised(filename):
+    mulliken = Mulliken.from_file(os.path.join(DATA, filename))
+    assert mulliken.polarised
+    assert list(mulliken.species) == ['Ni', 'Ni']
+    np.testing.assert_allclose(mulliken.charge, [[0.10, 0.10]])
+    np.testing.assert_allclose(mulliken.spin, [[0.70, -0.60]])
+
+
+def test_unpolarised():
+    mulliken = Mulliken.from_file(os.path.join(DATA, 'mulliken-unpolarised.castep'))
+    assert not mulliken.polarised
+    np.testing.assert_allclose(mulliken.charge, [[0.10, -0.10]])
+    np.testing.assert_allclose(mulliken.spin, [[0.0, 0.0]])
+
+
+def test_row():
+    row = "Ni 1 0.62 0.71 8.57 0.00 9.90 0.10 0.70"
+    assert mulliken_row(row, polarised=True) == ('Ni', 0.10, 0.70)
+    assert mulliken_row(row) == ('Ni', 0.70, 0.0)
+    assert mulliken_row("dn: 0.31 0.35 3.94 4.60", polarised=True) is None